@@ -1,15 +1,22 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
-from .models import CustomerUser, Orders
-from rangefilter.filters import DateRangeQuickSelectListFilterBuilder
+from .exports import export_response
+from .models import CartItem, CustomerUser, DailySales, Orders
+from rangefilter.filters import (
+    DateRangeQuickSelectListFilterBuilder,
+    NumericRangeFilterBuilder,
+)
 
-import csv
-import pandas as pd
+
+class CartItemInline(admin.TabularInline):
+    model = CartItem
+    extra = 0
 
 
 class CustomerUserAdmin(UserAdmin):
     model = CustomerUser
+    inlines = [CartItemInline]
     list_display = (
         "email",
         "first_name",
@@ -21,7 +28,7 @@ class CustomerUserAdmin(UserAdmin):
     list_filter = ("is_staff", "is_active")
     fieldsets = (
         (None, {"fields": ("email", "password")}),
-        ("Personal Info", {"fields": ("first_name", "last_name", "region", "cart")}),
+        ("Personal Info", {"fields": ("first_name", "last_name", "region")}),
         (
             "Permissions",
             {
@@ -56,16 +63,13 @@ class CustomerUserAdmin(UserAdmin):
 
 
 class OrderAdmin(admin.ModelAdmin):
+    @admin.action(description="Download selected orders as an Excel sheet")
     def download_selected_orders_to_excel_sheet(modeladmin, request, queryset):
-        dataset = []
-        for order in queryset:
-            for field in order.items:
-                field["username"] = order.name
-                field["order_id"] = str(order.id)
-                dataset.append(field)
+        return export_response(queryset.order_by("date"), "xlsx")
 
-        df = pd.DataFrame(dataset)
-        df.to_excel("name.xlsx", index=False)
+    @admin.action(description="Download selected orders as CSV")
+    def download_selected_orders_to_csv(modeladmin, request, queryset):
+        return export_response(queryset.order_by("date"), "csv")
 
     fieldsets = (
         (None, {"fields": ("id", "delivered")}),
@@ -88,15 +92,56 @@ class OrderAdmin(admin.ModelAdmin):
         "name",
         "region",
         "date",
+        "total_mrp",
+        "total_wsp",
         "delivered",
     ]
     readonly_fields = [
         "id",
     ]
-    list_filter = (("date", DateRangeQuickSelectListFilterBuilder()),)
-    actions = [download_selected_orders_to_excel_sheet]
+    list_filter = (
+        ("date", DateRangeQuickSelectListFilterBuilder()),
+        ("total_wsp", NumericRangeFilterBuilder(title="Order value")),
+    )
+    actions = [
+        download_selected_orders_to_excel_sheet,
+        download_selected_orders_to_csv,
+    ]
+
+
+class DailySalesAdmin(admin.ModelAdmin):
+    list_display = [
+        "day",
+        "region",
+        "brand",
+        "category",
+        "lines",
+        "units",
+        "mrp_total",
+        "wsp_total",
+        "delivered_lines",
+        "delivered_units",
+    ]
+    list_select_related = ["brand", "category"]
+    list_filter = (
+        ("day", DateRangeQuickSelectListFilterBuilder()),
+        "region",
+        "brand",
+        "category",
+    )
+
+    # Rollups are maintained from orders, see customers.sales
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 # Register the custom user model admin
 admin.site.register(CustomerUser, CustomerUserAdmin)
 admin.site.register(Orders, OrderAdmin)
+admin.site.register(DailySales, DailySalesAdmin)
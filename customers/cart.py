@@ -0,0 +1,95 @@
+from collections import namedtuple
+from uuid import UUID
+
+from django.db import IntegrityError, transaction
+
+from products.models import Product, StockItem
+from .models import CartItem
+
+
+PRODUCT_FIELDS = list(Product.PUBLIC_FIELDS)
+
+RELATED_FIELDS = ("brand", "category", "brick", "collection", "uploaded_by")
+
+CART_FIELDS = ("stock_id", "item_id", "volume")
+
+CartLine = namedtuple("CartLine", ["item", "product", "stock_item", "stock_group"])
+
+
+def parse_uuid(value):
+    try:
+        return UUID(str(value))
+    except ValueError:
+        return None
+
+
+def cart_entry(stock_id, item_id, volume):
+    """
+    A cart entry as stored in CartItem, or None if the values don't fit,
+    e.g. a volume that isn't a positive number.
+    """
+    try:
+        volume = int(volume)
+    except (TypeError, ValueError):
+        return None
+    entry = {"stock_id": str(stock_id), "item_id": str(item_id), "volume": volume}
+    max_length = CartItem._meta.get_field("stock_id").max_length
+    if volume < 1 or any(
+        not entry[field] or len(entry[field]) > max_length
+        for field in ("stock_id", "item_id")
+    ):
+        return None
+    return entry
+
+
+def cart_entries(user_id):
+    """The customer's cart entries in the order they were added."""
+    return list(CartItem.objects.filter(user_id=user_id).values(*CART_FIELDS))
+
+
+def add_to_cart(user_id, entry):
+    """
+    Insert one cart row. Returns False, without touching the cart, if the
+    stock item is already in it.
+    """
+    try:
+        with transaction.atomic():
+            CartItem.objects.create(user_id=user_id, **entry)
+    except IntegrityError:
+        return False
+    return True
+
+
+def remove_from_cart(user_id, stock_id):
+    CartItem.objects.filter(user_id=user_id, stock_id=str(stock_id)).delete()
+
+
+def hydrate_cart(cart_items):
+    """
+    Resolve cart entries to their products and stock groups with a fixed
+    number of queries, regardless of cart size. Raises Product.DoesNotExist if any entry
+    points to a missing product.
+    """
+    product_ids = [parse_uuid(item["item_id"]) for item in cart_items]
+    stock_ids = [parse_uuid(item["stock_id"]) for item in cart_items]
+
+    products = Product.objects.select_related(*RELATED_FIELDS).in_bulk(
+        [product_id for product_id in product_ids if product_id]
+    )
+    stock_items = StockItem.objects.prefetch_related("sizes").in_bulk(
+        [stock_id for stock_id in stock_ids if stock_id]
+    )
+
+    lines = []
+    for item, product_id, stock_id in zip(cart_items, product_ids, stock_ids):
+        product = products.get(product_id)
+        if product is None:
+            raise Product.DoesNotExist(f"Product {item['item_id']} not found")
+
+        stock_item = stock_items.get(stock_id)
+        if stock_item is not None and stock_item.product_id != product.pk:
+            stock_item = None
+        stock_group = stock_item.to_stock_group() if stock_item else None
+        lines.append(CartLine(item, product, stock_item, stock_group))
+
+    return lines
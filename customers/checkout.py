@@ -0,0 +1,137 @@
+from datetime import datetime
+from decimal import Decimal
+from uuid import UUID
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from products.cache import catalog_cache
+from products.models import Product, StockItem
+from .cart import PRODUCT_FIELDS, cart_entries, hydrate_cart
+from .models import CartItem, OrderLine, Orders
+from .sales import record_order
+
+
+class OutOfStock(Exception):
+    def __init__(self, title):
+        super().__init__(f"{title} is Out Of Stock.")
+        self.title = title
+
+
+def order_item(line):
+    """Snapshot of a cart line as stored in Orders.items."""
+    stock_group = line.stock_group
+    data = {}
+    for field in PRODUCT_FIELDS:
+        value = getattr(line.product, field)
+        if field == "uploaded_by":
+            data[field] = value.username if value else None
+        elif field == "stock_items":
+            data["total_items"] = stock_group["total"]
+            data["stock_title"] = stock_group["title"]
+            data["stock_id"] = str(stock_group["id"])
+            data["discount"] = stock_group["discount"]
+            data["items"] = stock_group["items"]
+            data["volume"] = line.item["volume"]
+        elif hasattr(value, "name"):
+            data[field] = value.name
+        elif type(value) == UUID or type(value) == Decimal or type(value) == datetime:
+            if field == "id":
+                data["product_id"] = str(value)
+            else:
+                data[field] = str(value)
+        else:
+            data[field] = value
+    return data
+
+
+def order_line(order, line):
+    """OrderLine for a cart line, written next to its Orders.items snapshot."""
+    product = line.product
+    return OrderLine(
+        order=order,
+        product_id=product.pk,
+        stock_item_id=line.stock_item.pk,
+        brand_id=product.brand_id,
+        category_id=product.category_id,
+        volume=int(line.item["volume"]),
+        mrp=product.mrp,
+        wsp=product.wsp,
+        discount=line.stock_item.discount,
+        region=order.region,
+        date=order.date,
+    )
+
+
+def reserve_stock(stock_id, volume):
+    """
+    Conditionally decrement a stock group. The WHERE clause makes the check
+    and the write one statement, so concurrent checkouts cannot oversell.
+    Cart lines don't name a size, so the size quantities are left as
+    stocked, see validate_stock_total.
+    """
+    return StockItem.objects.filter(pk=stock_id, total__gte=volume).update(
+        total=F("total") - volume
+    )
+
+
+def place_order(active_user):
+    """
+    Reserve stock for every cart line, create the order and clear the cart
+    in one transaction. active_user needs pk, email and region, a customer
+    or their Identity. Raises OutOfStock (and rolls back every reservation)
+    if any line can't be filled.
+    """
+    # Reads happen before the transaction so its first statement is a write,
+    # which lets SQLite wait on the lock instead of failing the upgrade.
+    cart_lines = hydrate_cart(cart_entries(active_user.pk))
+    for line in cart_lines:
+        if line.stock_item is None:
+            raise OutOfStock(line.product.title)
+
+    items = [order_item(line) for line in cart_lines]
+
+    # Lock rows in a stable order to avoid deadlocks between checkouts
+    reservations = sorted(
+        ((line.stock_item, int(line.item["volume"])) for line in cart_lines),
+        key=lambda reservation: str(reservation[0].pk),
+    )
+
+    with transaction.atomic():
+        for stock_item, volume in reservations:
+            if not reserve_stock(stock_item.pk, volume):
+                raise OutOfStock(stock_item.title)
+
+        order = Orders(
+            name=active_user.email,
+            region=active_user.region,
+            date=timezone.now(),
+            items=items,
+        )
+        lines = [order_line(order, line) for line in cart_lines]
+        totals = [line.totals() for line in lines]
+        order.total_mrp = sum(mrp for mrp, _ in totals)
+        order.total_wsp = sum(wsp for _, wsp in totals)
+        order.save(force_insert=True)
+
+        OrderLine.objects.bulk_create(lines)
+        record_order(order, lines)
+
+        # Only what was ordered, an item added meanwhile stays in the cart
+        CartItem.objects.filter(
+            user_id=active_user.pk,
+            stock_id__in=[line.item["stock_id"] for line in cart_lines],
+        ).delete()
+
+        for product_id in {stock_item.product_id for stock_item, _ in reservations}:
+            Product(pk=product_id).refresh_stock_items()
+
+        # Cached listings may show a lower count for a while, checkout
+        # rechecks it anyway. Only a sold out stock item is worth
+        # invalidating every cached page for.
+        stock_ids = [stock_item.pk for stock_item, _ in reservations]
+        if StockItem.objects.filter(pk__in=stock_ids, total=0).exists():
+            transaction.on_commit(catalog_cache.bump_version)
+
+    return order
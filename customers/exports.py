@@ -0,0 +1,150 @@
+import csv
+import io
+import tempfile
+
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from openpyxl import Workbook
+
+from shopipy_server.renderers import dumps
+from .cart import PRODUCT_FIELDS
+
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# What checkout.order_item stores in place of the stock_items projection
+STOCK_COLUMNS = [
+    "total_items",
+    "stock_title",
+    "stock_id",
+    "discount",
+    "items",
+    "volume",
+]
+
+
+def export_columns():
+    columns = []
+    for field in PRODUCT_FIELDS:
+        if field == "id":
+            columns.append("product_id")
+        elif field == "stock_items":
+            columns += STOCK_COLUMNS
+        else:
+            columns.append(field)
+    return columns + ["username", "order_id"]
+
+
+EXPORT_COLUMNS = export_columns()
+
+
+def cell_value(value):
+    # Nested values, e.g. the sizes of a stock group, go in as JSON text
+    if isinstance(value, (dict, list)):
+        return dumps(value).decode()
+    return value
+
+
+def export_rows(queryset):
+    """
+    One row of EXPORT_COLUMNS per order line. Orders are read a chunk at a
+    time, so memory stays flat however many are selected.
+    """
+    orders = queryset.only("id", "name", "items").iterator(
+        chunk_size=settings.ORDER_EXPORT_CHUNK_SIZE
+    )
+    for order in orders:
+        for item in order.items or []:
+            # Skips the [""] placeholder of an order without lines
+            if not isinstance(item, dict):
+                continue
+            line = {**item, "username": order.name, "order_id": str(order.id)}
+            yield [cell_value(line.get(column)) for column in EXPORT_COLUMNS]
+
+
+class Echo:
+    """Write target for csv.writer that hands each line back instead."""
+
+    def write(self, value):
+        return value
+
+
+def csv_chunks(rows, chunk_size=1000):
+    writer = csv.writer(Echo())
+    chunk = [writer.writerow(EXPORT_COLUMNS)]
+    for row in rows:
+        chunk.append(writer.writerow(row))
+        if len(chunk) == chunk_size:
+            yield "".join(chunk)
+            chunk = []
+    yield "".join(chunk)
+
+
+def write_export(rows, export_format, file, progress=None, progress_every=10000):
+    """
+    Write rows as CSV or XLSX into a binary file, calling progress with the
+    number of lines written every progress_every lines. Returns the count.
+    """
+    if export_format == "csv":
+        text = io.TextIOWrapper(file, encoding="utf-8", newline="")
+        writer = csv.writer(text)
+        writer.writerow(EXPORT_COLUMNS)
+        append = writer.writerow
+    else:
+        # Write-only sheets go to a temp file row by row, nothing is kept
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Orders")
+        sheet.append(EXPORT_COLUMNS)
+        append = sheet.append
+
+    count = 0
+    for row in rows:
+        append(row)
+        count += 1
+        if progress and count % progress_every == 0:
+            progress(count)
+
+    if export_format == "csv":
+        text.flush()
+        # Leave the file open for the caller
+        text.detach()
+    else:
+        workbook.save(file)
+    if progress and count % progress_every:
+        progress(count)
+    return count
+
+
+def export_filename(export_format):
+    return f"orders-{timezone.now():%Y%m%d-%H%M%S}.{export_format}"
+
+
+def export_response(queryset, export_format):
+    """
+    The selected orders as a download. CSV streams straight from the query,
+    an XLSX file is a zip archive, so it's spooled to a temp file first.
+    """
+    rows = export_rows(queryset)
+    filename = export_filename(export_format)
+
+    if export_format == "csv":
+        response = StreamingHttpResponse(
+            csv_chunks(rows), content_type=EXPORT_FORMATS["csv"]
+        )
+        response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    # Deleted as soon as the response closes it
+    spool = tempfile.TemporaryFile()
+    write_export(rows, export_format, spool)
+    spool.seek(0)
+    return FileResponse(
+        spool,
+        as_attachment=True,
+        filename=filename,
+        content_type=EXPORT_FORMATS[export_format],
+    )
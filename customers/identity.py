@@ -0,0 +1,98 @@
+import time
+from collections import OrderedDict, namedtuple
+from threading import Lock
+
+from django.conf import settings
+
+from .models import CustomerUser
+
+
+Identity = namedtuple("Identity", ["pk", "email", "region", "is_staff"])
+
+
+class IdentityCache:
+    """
+    Short-lived, per-process map of token email to the few user columns
+    most views need. Entries are dropped on CustomerUser save/delete in this
+    process and expire after ttl seconds everywhere else.
+    """
+
+    def __init__(self, ttl=30, max_entries=4096):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, email):
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None:
+                return None
+            identity, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[email]
+                return None
+            self._entries.move_to_end(email)
+            return identity
+
+    def set(self, identity):
+        with self._lock:
+            self._entries[identity.email] = (identity, time.monotonic() + self.ttl)
+            self._entries.move_to_end(identity.email)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, email):
+        with self._lock:
+            self._entries.pop(email, None)
+
+
+identities = IdentityCache(ttl=getattr(settings, "IDENTITY_CACHE_TTL", 30))
+
+
+def identity_row(email):
+    return CustomerUser.objects.filter(email=email).values_list(*Identity._fields)
+
+
+def remember_identity(email, row):
+    if row is None:
+        raise CustomerUser.DoesNotExist(f"No customer for {email}")
+    identity = Identity(*row)
+    identities.set(identity)
+    return identity
+
+
+def resolve_identity(email):
+    identity = identities.get(email)
+    if identity is None:
+        identity = remember_identity(email, identity_row(email).first())
+    return identity
+
+
+async def aresolve_identity(email):
+    identity = identities.get(email)
+    if identity is None:
+        identity = remember_identity(email, await identity_row(email).afirst())
+    return identity
+
+
+def get_identity(request):
+    """The requesting customer's identity, resolved at most once per request."""
+    if not hasattr(request, "_identity"):
+        request._identity = resolve_identity(getattr(request, "user_id", None))
+    return request._identity
+
+
+async def aget_identity(request):
+    if not hasattr(request, "_identity"):
+        request._identity = await aresolve_identity(getattr(request, "user_id", None))
+    return request._identity
+
+
+def get_customer(request, *fields):
+    """
+    The requesting customer with only the given columns loaded, e.g.
+    get_customer(request, "region"). Raises CustomerUser.DoesNotExist.
+    """
+    identity = get_identity(request)
+    return CustomerUser.objects.only("email", *fields).get(pk=identity.pk)
@@ -0,0 +1,92 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from customers.cart import parse_uuid
+from customers.models import OrderLine, Orders
+from products.models import Product
+
+
+def parse_decimal(value, default=None):
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return default
+
+
+def snapshot_line(order, item, products):
+    """
+    OrderLine from an Orders.items snapshot. Brand and category ids come
+    from the product as it is now, they're left empty if it's gone.
+    """
+    product_id = parse_uuid(item.get("product_id"))
+    brand_id, category_id = products.get(product_id, (None, None))
+    return OrderLine(
+        order=order,
+        product_id=product_id,
+        stock_item_id=parse_uuid(item.get("stock_id")),
+        brand_id=brand_id,
+        category_id=category_id,
+        volume=int(parse_decimal(item.get("volume"), 0)),
+        mrp=parse_decimal(item.get("mrp")),
+        wsp=parse_decimal(item.get("wsp")),
+        discount=parse_decimal(item.get("discount"), 0),
+        region=order.region,
+        date=order.date,
+    )
+
+
+class Command(BaseCommand):
+    help = "Write OrderLine rows for orders placed before they existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        # Orders with lines are skipped, so an interrupted run just resumes
+        pending = (
+            Orders.objects.filter(
+                ~Exists(OrderLine.objects.filter(order=OuterRef("pk")))
+            )
+            .only("id", "region", "date", "items")
+            .order_by("pk")
+        )
+
+        last_pk = None
+        order_count = line_count = 0
+        while True:
+            batch = pending if last_pk is None else pending.filter(pk__gt=last_pk)
+            orders = list(batch[: options["batch_size"]])
+            if not orders:
+                break
+            last_pk = orders[-1].pk
+
+            items = [
+                (order, item)
+                for order in orders
+                for item in order.items or []
+                # Skips the [""] placeholder of an order without lines
+                if isinstance(item, dict)
+            ]
+            product_ids = {parse_uuid(item.get("product_id")) for _, item in items}
+            products = {
+                pk: (brand_id, category_id)
+                for pk, brand_id, category_id in Product.objects.filter(
+                    pk__in=product_ids - {None}
+                ).values_list("pk", "brand_id", "category_id")
+            }
+
+            # A batch goes in whole, no order is left half backfilled
+            with transaction.atomic():
+                lines = OrderLine.objects.bulk_create(
+                    snapshot_line(order, item, products) for order, item in items
+                )
+
+            order_count += len(orders)
+            line_count += len(lines)
+            self.stdout.write(f"Backfilled {line_count} lines of {order_count} orders")
+
+        if line_count:
+            self.stdout.write("Run rebuild_daily_sales to roll the new lines up")
@@ -0,0 +1,106 @@
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from customers.models import Orders
+
+
+def to_numbers(values):
+    """Snapshot values, often strings, as floats with 0 for missing ones."""
+    numbers = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce")
+    return numbers.fillna(0).to_numpy(np.float64)
+
+
+def to_cents(values):
+    # Two decimal places survive the float round trip, rint recovers them
+    return np.rint(to_numbers(values) * 100).astype(np.int64)
+
+
+def order_totals(orders):
+    """
+    (total_mrp, total_wsp) in cents per order, the same arithmetic as
+    customers.models.line_totals done on integer arrays.
+    """
+    order_index, mrp, wsp, volume, discount = [], [], [], [], []
+    for index, order in enumerate(orders):
+        for item in order.items or []:
+            # Skips the [""] placeholder of an order without lines
+            if not isinstance(item, dict):
+                continue
+            order_index.append(index)
+            mrp.append(item.get("mrp"))
+            wsp.append(item.get("wsp"))
+            volume.append(item.get("volume"))
+            discount.append(item.get("discount"))
+
+    volume = to_numbers(volume).astype(np.int64)
+    line_mrp = to_cents(mrp) * volume
+    # Discount in hundredths of a percent, rounded half up to the cent
+    wsp_share = to_cents(wsp) * volume * (10000 - to_cents(discount))
+    line_wsp = (wsp_share * 2 + 10000) // 20000
+
+    total_mrp = np.zeros(len(orders), np.int64)
+    total_wsp = np.zeros(len(orders), np.int64)
+    np.add.at(total_mrp, order_index, line_mrp)
+    np.add.at(total_wsp, order_index, line_wsp)
+    return total_mrp, total_wsp
+
+
+def save_totals(orders):
+    # One prepared UPDATE run per order. bulk_update builds a CASE branch
+    # per row and spends far longer on that than on the arithmetic
+    meta = Orders._meta
+    fields = [meta.get_field("total_mrp"), meta.get_field("total_wsp"), meta.pk]
+    quote = connection.ops.quote_name
+    sql = "UPDATE %s SET %s = %%s, %s = %%s WHERE %s = %%s" % (
+        quote(meta.db_table),
+        *(quote(field.column) for field in fields),
+    )
+    params = [
+        [
+            field.get_db_prep_save(getattr(order, field.attname), connection)
+            for field in fields
+        ]
+        for order in orders
+    ]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+class Command(BaseCommand):
+    help = "Fill Orders.total_mrp and total_wsp from the items snapshots."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--all", action="store_true", help="Recompute orders that have totals."
+        )
+
+    def handle(self, *args, **options):
+        orders = Orders.objects.only("id", "items").order_by("pk")
+        if not options["all"]:
+            orders = orders.filter(
+                Q(total_mrp__isnull=True) | Q(total_wsp__isnull=True)
+            )
+
+        last_pk = None
+        count = 0
+        while True:
+            batch = orders if last_pk is None else orders.filter(pk__gt=last_pk)
+            batch = list(batch[: options["batch_size"]])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            total_mrp, total_wsp = order_totals(batch)
+            for order, mrp_cents, wsp_cents in zip(batch, total_mrp, total_wsp):
+                order.total_mrp = Decimal(int(mrp_cents)).scaleb(-2)
+                order.total_wsp = Decimal(int(wsp_cents)).scaleb(-2)
+            save_totals(batch)
+
+            count += len(batch)
+            self.stdout.write(f"Backfilled totals of {count} orders")
@@ -0,0 +1,141 @@
+import multiprocessing
+import resource
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from shopipy_server.benchmarks import throwaway_database
+
+
+MODES = ["dataframe", "csv", "xlsx"]
+
+
+def sample_line(index):
+    return {
+        "product_id": "2c862794-2ea4-4162-8d2e-3f029941e13b",
+        "brand": "Brand",
+        "title": f"Printed cotton kurta {index}",
+        "category": "Kurta",
+        "brick": "Top",
+        "gender": "Men, Women",
+        "mrp": "1999.00",
+        "wsp": "1199.00",
+        "style_code": f"SC-{index:06d}",
+        "image_1": f"media/product-{index}.jpg",
+        "created": "2026-10-18 10:00:00+00:00",
+        "go_live_date": "2026-10-18 10:00:00+00:00",
+        "total_items": 6,
+        "stock_title": "Pack of 6",
+        "stock_id": "a485502a-0f1a-43a0-a977-dc6ac16c3a0c",
+        "discount": "10.00",
+        "items": {size: {"qty": 1} for size in ("S", "M", "L", "XL")},
+        "volume": 2,
+        "is_active": True,
+    }
+
+
+def run_mode(mode, database_name, results):
+    # Runs in a fresh process so ru_maxrss is this export's own peak. The
+    # module is imported there before Django is set up, hence the late imports
+    import django
+
+    django.setup()
+    connections["default"].settings_dict["NAME"] = database_name
+
+    from customers.exports import export_rows, write_export
+    from customers.models import Orders
+
+    orders = Orders.objects.order_by("date")
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+
+    with tempfile.TemporaryFile() as output:
+        if mode == "dataframe":
+            # What the admin action did before: every line in a list, then
+            # one DataFrame written out in one go
+            import pandas as pd
+
+            dataset = []
+            for order in orders:
+                for field in order.items:
+                    field["username"] = order.name
+                    field["order_id"] = str(order.id)
+                    dataset.append(field)
+            pd.DataFrame(dataset).to_excel(output, index=False)
+        else:
+            write_export(export_rows(orders), mode, output)
+        size = output.tell()
+
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((elapsed, peak - baseline, size))
+
+
+class Command(BaseCommand):
+    help = "Compare peak RSS of the old DataFrame order export and the streamed one."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lines",
+            type=int,
+            action="append",
+            default=[],
+            help="Order lines to export, repeat for several, e.g. --lines 100000.",
+        )
+        parser.add_argument("--lines-per-order", type=int, default=4)
+        parser.add_argument(
+            "--modes",
+            default=",".join(MODES),
+            help="Comma-separated, of " + ", ".join(MODES),
+        )
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context("spawn")
+        modes = options["modes"].split(",")
+        self.stdout.write(
+            f"{'lines':>9} {'mode':<10} {'wall s':>8} {'+rss MB':>8} {'file MB':>8}"
+        )
+
+        with throwaway_database() as connection:
+            database_name = connection.settings_dict["NAME"]
+            count = 0
+            for size in sorted(options["lines"] or [10000, 100000]):
+                self.populate(count, size, options["lines_per_order"])
+                count = size
+                # Children read the file, make sure it's all there
+                connection.close()
+
+                for mode in modes:
+                    results = context.Queue()
+                    process = context.Process(
+                        target=run_mode, args=(mode, database_name, results)
+                    )
+                    process.start()
+                    elapsed, rss_delta, file_size = results.get()
+                    process.join()
+                    self.stdout.write(
+                        f"{size:>9} {mode:<10} {elapsed:>8.2f} "
+                        f"{rss_delta / 1024:>8.1f} {file_size / 2**20:>8.1f}"
+                    )
+
+    def populate(self, start, stop, lines_per_order):
+        from customers.models import Orders
+
+        now = timezone.now()
+        for batch_start in range(start, stop, 20000):
+            batch_stop = min(batch_start + 20000, stop)
+            Orders.objects.bulk_create(
+                Orders(
+                    name=f"customer-{index % 1000}@example.com",
+                    region="western",
+                    date=now,
+                    items=[
+                        sample_line(line)
+                        for line in range(index, min(index + lines_per_order, stop))
+                    ],
+                )
+                for index in range(batch_start, batch_stop, lines_per_order)
+            )
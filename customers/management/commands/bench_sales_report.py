@@ -0,0 +1,112 @@
+import random
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from customers.models import OrderLine, Orders
+from customers.sales import rebuild_daily_sales, sales_report
+from products.models import Brand, Category
+from shopipy_server.benchmarks import throwaway_database
+
+
+REGIONS = ["western", "south_indian", "north_indian", "east_indian"]
+
+
+def scan_orders(since, until):
+    # What a report meant before: every order's JSON parsed in Python
+    units = defaultdict(int)
+    orders = Orders.objects.filter(date__date__range=(since, until))
+    for order in orders.iterator(chunk_size=2000):
+        for item in order.items:
+            units[(timezone.localdate(order.date), item["brand"])] += int(
+                item["volume"]
+            )
+    return units
+
+
+def scan_lines(since, until):
+    return list(
+        OrderLine.objects.filter(date__date__range=(since, until))
+        .values("brand__name", day=TruncDate("date"))
+        .annotate(units=Sum("volume"))
+    )
+
+
+class Command(BaseCommand):
+    help = "Compare a year's sales report from Orders, OrderLine and the rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=100000)
+        parser.add_argument("--lines-per-order", type=int, default=3)
+        parser.add_argument("--brands", type=int, default=20)
+        parser.add_argument("--categories", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        with throwaway_database():
+            brands = [
+                Brand.objects.create(name=f"Brand {i}", slug=f"b{i}")
+                for i in range(options["brands"])
+            ]
+            categories = [
+                Category.objects.create(name=f"Category {i}", slug=f"c{i}")
+                for i in range(options["categories"])
+            ]
+            self.populate(rng, options, brands, categories)
+
+            started = time.perf_counter()
+            rows = rebuild_daily_sales()
+            self.stdout.write(
+                f"rebuild: {rows} rollup rows in {time.perf_counter() - started:.2f} s"
+            )
+
+            until = timezone.localdate()
+            since = until - timedelta(days=365)
+            reports = {
+                "orders json": lambda: scan_orders(since, until),
+                "order lines": lambda: scan_lines(since, until),
+                "rollups": lambda: sales_report(since, until, ["day", "brand"]),
+            }
+            for name, report in reports.items():
+                started = time.perf_counter()
+                for _ in range(options["repeat"]):
+                    report()
+                elapsed = (time.perf_counter() - started) / options["repeat"]
+                self.stdout.write(f"{name:<12} {elapsed * 1000:10.1f} ms/report")
+
+    def populate(self, rng, options, brands, categories):
+        now = timezone.now()
+        for batch_start in range(0, options["orders"], 5000):
+            orders, lines = [], []
+            for _ in range(batch_start, min(batch_start + 5000, options["orders"])):
+                order = Orders(
+                    name="customer@example.com",
+                    region=rng.choice(REGIONS),
+                    date=now - timedelta(days=rng.randint(0, 364)),
+                    delivered=rng.random() < 0.7,
+                    items=[],
+                )
+                for _ in range(options["lines_per_order"]):
+                    line = OrderLine(
+                        order=order,
+                        brand=rng.choice(brands),
+                        category=rng.choice(categories),
+                        volume=rng.randint(1, 6),
+                        mrp=rng.randint(500, 5000),
+                        wsp=rng.randint(300, 3000),
+                        region=order.region,
+                        date=order.date,
+                    )
+                    order.items.append(
+                        {"brand": line.brand.name, "volume": line.volume}
+                    )
+                    lines.append(line)
+                orders.append(order)
+            Orders.objects.bulk_create(orders)
+            OrderLine.objects.bulk_create(lines)
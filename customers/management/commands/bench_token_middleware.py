@@ -0,0 +1,70 @@
+import time
+from datetime import datetime, timedelta
+
+import jwt
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from shopipy_server.middleware import TokenAuthenticationMiddleware, verified_tokens
+
+
+def double_decode(request):
+    # What the two per-app middlewares did on every request
+    token = request.META["HTTP_AUTHORIZATION"].split()[1]
+    for _ in range(2):
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+        request.user_id = payload.get("user_id")
+    return HttpResponse()
+
+
+class Command(BaseCommand):
+    help = "Measure the token middleware overhead per request."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=20000)
+        parser.add_argument(
+            "--clients",
+            type=int,
+            default=100,
+            help="Distinct tokens cycled through, like concurrent clients.",
+        )
+
+    def handle(self, *args, **options):
+        expiry = datetime.utcnow() + timedelta(hours=1)
+        headers = [
+            "Bearer "
+            + jwt.encode(
+                {"user_id": f"client-{index}@example.com", "exp": expiry},
+                settings.SECRET_KEY,
+                algorithm="HS256",
+            )
+            for index in range(options["clients"])
+        ]
+        factory = RequestFactory()
+        requests = [
+            factory.get("/products/", HTTP_AUTHORIZATION=headers[index % len(headers)])
+            for index in range(options["requests"])
+        ]
+
+        middleware = TokenAuthenticationMiddleware(lambda request: HttpResponse())
+        max_entries = verified_tokens.max_entries
+
+        self.report("two middlewares (decode x2)", double_decode, requests)
+
+        verified_tokens.clear()
+        verified_tokens.max_entries = 0
+        self.report("shared middleware, no cache", middleware, requests)
+
+        verified_tokens.max_entries = max_entries
+        self.report("shared middleware, token cache", middleware, requests)
+
+    def report(self, label, handler, requests):
+        started = time.perf_counter()
+        for request in requests:
+            handler(request)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{label:<32} {elapsed / len(requests) * 1e6:8.2f} us/request"
+        )
@@ -0,0 +1,65 @@
+import os
+import tempfile
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from customers.exports import EXPORT_FORMATS, export_filename, export_rows, write_export
+from customers.models import Orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Export order lines to a CSV or XLSX file in the background, for "
+        "selections too large to download from the admin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="xlsx")
+        parser.add_argument(
+            "--output", help="Defaults to orders-<timestamp>.<format> in the cwd."
+        )
+        parser.add_argument(
+            "--since", type=date.fromisoformat, help="First order date, YYYY-MM-DD."
+        )
+        parser.add_argument(
+            "--until", type=date.fromisoformat, help="Last order date, YYYY-MM-DD."
+        )
+        parser.add_argument(
+            "--progress-every",
+            type=int,
+            default=100000,
+            help="Report progress every this many lines.",
+        )
+
+    def handle(self, *args, **options):
+        orders = Orders.objects.order_by("date")
+        if options["since"]:
+            orders = orders.filter(date__date__gte=options["since"])
+        if options["until"]:
+            orders = orders.filter(date__date__lte=options["until"])
+
+        output = os.path.abspath(
+            options["output"] or export_filename(options["format"])
+        )
+
+        # Spooled next to the output and moved into place once complete, so
+        # nobody ever picks up half a file
+        spool = tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(output), suffix=".part", delete=False
+        )
+        try:
+            with spool:
+                count = write_export(
+                    export_rows(orders),
+                    options["format"],
+                    spool,
+                    progress=lambda lines: self.stdout.write(f"Exported {lines} lines"),
+                    progress_every=options["progress_every"],
+                )
+            os.replace(spool.name, output)
+        except BaseException:
+            os.unlink(spool.name)
+            raise
+
+        self.stdout.write(f"Wrote {count} order lines to {output}")
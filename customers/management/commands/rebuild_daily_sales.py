@@ -0,0 +1,24 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from customers.sales import rebuild_daily_sales
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the daily sales rollups from OrderLine, e.g. after "
+        "backfill_order_lines. Without dates every day is rebuilt."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since", type=date.fromisoformat, help="First day, YYYY-MM-DD."
+        )
+        parser.add_argument(
+            "--until", type=date.fromisoformat, help="Last day, YYYY-MM-DD."
+        )
+
+    def handle(self, *args, **options):
+        rows = rebuild_daily_sales(options["since"], options["until"])
+        self.stdout.write(f"Wrote {rows} daily sales rows")
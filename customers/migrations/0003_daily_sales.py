@@ -0,0 +1,80 @@
+# Generated by Django 5.0 on 2026-10-18 19:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("customers", "0002_order_lines"),
+        ("products", "0010_product_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailySales",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("region", models.CharField(blank=True, default="", max_length=150)),
+                ("lines", models.IntegerField(default=0)),
+                ("units", models.IntegerField(default=0)),
+                (
+                    "mrp_total",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "wsp_total",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("delivered_lines", models.IntegerField(default=0)),
+                ("delivered_units", models.IntegerField(default=0)),
+                (
+                    "brand",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="products.brand",
+                    ),
+                ),
+                (
+                    "category",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="products.category",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "daily sales",
+                "ordering": ("-day", "region"),
+                "indexes": [
+                    models.Index(
+                        fields=["region", "day"], name="daily_sales_region_day_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="dailysales",
+            constraint=models.UniqueConstraint(
+                fields=("day", "region", "brand", "category"),
+                name="unique_daily_sales_cell",
+            ),
+        ),
+    ]
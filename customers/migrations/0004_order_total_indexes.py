@@ -0,0 +1,20 @@
+# Generated by Django 5.0 on 2026-10-18 20:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("customers", "0003_daily_sales"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="orders",
+            index=models.Index(fields=["total_wsp"], name="order_total_wsp_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="orders",
+            index=models.Index(fields=["total_mrp"], name="order_total_mrp_idx"),
+        ),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 5.0 on 2026-10-18 20:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# The CartItem columns as created below
+ID_MAX_LENGTH = 64
+
+
+def cart_entry(item):
+    """A JSON cart entry as CartItem fields, None if it doesn't fit them."""
+    if not isinstance(item, dict):
+        return None
+    try:
+        volume = int(item.get("volume"))
+    except (TypeError, ValueError):
+        return None
+    entry = {
+        "stock_id": str(item.get("stock_id") or ""),
+        "item_id": str(item.get("item_id") or ""),
+        "volume": volume,
+    }
+    if volume < 1 or any(
+        not entry[field] or len(entry[field]) > ID_MAX_LENGTH
+        for field in ("stock_id", "item_id")
+    ):
+        return None
+    return entry
+
+
+def copy_carts(apps, schema_editor):
+    CustomerUser = apps.get_model("customers", "CustomerUser")
+    CartItem = apps.get_model("customers", "CartItem")
+
+    items = []
+    for user_id, cart in CustomerUser.objects.exclude(cart=[]).values_list(
+        "pk", "cart"
+    ):
+        stock_ids = set()
+        for item in cart or []:
+            entry = cart_entry(item)
+            # SaveCartView never added a stock item twice, keep the first
+            if entry is None or entry["stock_id"] in stock_ids:
+                continue
+            stock_ids.add(entry["stock_id"])
+            items.append(CartItem(user_id=user_id, **entry))
+
+    CartItem.objects.bulk_create(items, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("customers", "0004_order_total_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="customeruser",
+            name="cart",
+            field=models.JSONField(blank=True, default=list, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name="CartItem",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("stock_id", models.CharField(max_length=64)),
+                ("item_id", models.CharField(max_length=64)),
+                ("volume", models.PositiveIntegerField()),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="cart_items",
+                        to="customers.customeruser",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("user", "id"),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="cartitem",
+            constraint=models.UniqueConstraint(
+                fields=("user", "stock_id"), name="unique_cart_item"
+            ),
+        ),
+        migrations.RunPython(copy_carts, migrations.RunPython.noop),
+    ]
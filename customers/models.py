@@ -5,6 +5,9 @@ from django.contrib.auth.models import (
 )
 from django.db import models
 
+from products.models import Brand, Category, Product, StockItem
+
+from decimal import ROUND_HALF_UP, Decimal
 import uuid
 
 
@@ -42,11 +45,12 @@ class CustomerUser(AbstractBaseUser, PermissionsMixin):
     )
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Superseded by CartItem, only read by the migration that copied it
     cart = models.JSONField(
         blank=True,
         null=True,
         default=list,
-        help_text="Refer to jsonformatter.org",
+        editable=False,
     )
 
     objects = CustomerUserManager()
@@ -75,6 +79,30 @@ class CustomerUser(AbstractBaseUser, PermissionsMixin):
     objects = CustomerUserManager()
 
 
+class CartItem(models.Model):
+    """One cart entry, so adding or removing one never rewrites the others."""
+
+    user = models.ForeignKey(
+        CustomerUser, related_name="cart_items", on_delete=models.CASCADE
+    )
+    # As sent by the client, see cart.hydrate_cart
+    stock_id = models.CharField(max_length=64)
+    item_id = models.CharField(max_length=64)
+    volume = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ("user", "id")
+        constraints = [
+            # Also the index the cart is read through
+            models.UniqueConstraint(
+                fields=["user", "stock_id"], name="unique_cart_item"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.stock_id} x {self.volume}"
+
+
 # Don't remove
 def default_stock_items():
     return [""]
@@ -100,6 +128,104 @@ class Orders(models.Model):
 
     class Meta:
         verbose_name_plural = "Orders"
+        indexes = [
+            # Sorting and filtering the admin by order value
+            models.Index(fields=["total_wsp"], name="order_total_wsp_idx"),
+            models.Index(fields=["total_mrp"], name="order_total_mrp_idx"),
+        ]
 
     def __str__(self):
         return self.name
+
+
+def line_totals(mrp, wsp, volume, discount):
+    """
+    (MRP, WSP) value of an order line, each rounded to the paisa. The stock
+    group's discount is a percentage off the wholesale price.
+    """
+    cent = Decimal("0.01")
+    mrp_total = Decimal(mrp or 0) * volume
+    wsp_total = Decimal(wsp or 0) * volume * (100 - Decimal(discount or 0)) / 100
+    return (
+        mrp_total.quantize(cent, ROUND_HALF_UP),
+        wsp_total.quantize(cent, ROUND_HALF_UP),
+    )
+
+
+def catalog_reference(model):
+    # Lines outlive the catalog rows they point at, so there's no constraint
+    # and nothing cascades; a deleted product leaves a dangling id behind
+    return models.ForeignKey(
+        model,
+        related_name="+",
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        blank=True,
+        null=True,
+    )
+
+
+class OrderLine(models.Model):
+    """One row per line of Orders.items, for queries over what was sold."""
+
+    order = models.ForeignKey(Orders, related_name="lines", on_delete=models.CASCADE)
+    product = catalog_reference(Product)
+    stock_item = catalog_reference(StockItem)
+    brand = catalog_reference(Brand)
+    category = catalog_reference(Category)
+    volume = models.PositiveIntegerField(default=0)
+    mrp = models.DecimalField(max_digits=9, decimal_places=2, blank=True, null=True)
+    wsp = models.DecimalField(max_digits=9, decimal_places=2, blank=True, null=True)
+    discount = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    # Copied from the order so the indexes below cover the usual queries
+    region = models.CharField(max_length=150, blank=True, null=True)
+    date = models.DateTimeField()
+
+    class Meta:
+        verbose_name_plural = "order lines"
+        indexes = [
+            models.Index(
+                fields=["product", "date"], name="order_line_product_date_idx"
+            ),
+            models.Index(fields=["region", "date"], name="order_line_region_date_idx"),
+        ]
+
+    def totals(self):
+        return line_totals(self.mrp, self.wsp, self.volume, self.discount)
+
+    def __str__(self):
+        return f"{self.order_id}: {self.product_id} x {self.volume}"
+
+
+class DailySales(models.Model):
+    """
+    OrderLine totals per day, region, brand and category. Kept current as
+    orders are placed, delivered or deleted, see customers.sales.
+    """
+
+    day = models.DateField()
+    region = models.CharField(max_length=150, blank=True, default="")
+    brand = catalog_reference(Brand)
+    category = catalog_reference(Category)
+    lines = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    mrp_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    wsp_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    delivered_lines = models.IntegerField(default=0)
+    delivered_units = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "daily sales"
+        ordering = ("-day", "region")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "region", "brand", "category"],
+                name="unique_daily_sales_cell",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["region", "day"], name="daily_sales_region_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.region}"
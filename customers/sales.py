@@ -0,0 +1,184 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, Round, TruncDate
+from django.utils import timezone
+
+from products.models import Brand, Category
+from .models import DailySales, OrderLine
+
+
+SALES_FIELDS = [
+    "lines",
+    "units",
+    "mrp_total",
+    "wsp_total",
+    "delivered_lines",
+    "delivered_units",
+]
+
+DELIVERY_FIELDS = ["delivered_lines", "delivered_units"]
+
+# ?group_by= dimensions of the sales report
+REPORT_DIMENSIONS = {
+    "day": "day",
+    "region": "region",
+    "brand": "brand_id",
+    "category": "category_id",
+}
+
+# Reported by name, looked up after grouping by id
+NAMED_DIMENSIONS = {
+    "brand": Brand,
+    "category": Category,
+}
+
+
+def sales_cells(lines, delivered):
+    """{(day, region, brand_id, category_id): {field: amount}} for order lines."""
+    cells = defaultdict(lambda: defaultdict(int))
+    for line in lines:
+        key = (
+            timezone.localdate(line.date),
+            line.region or "",
+            line.brand_id,
+            line.category_id,
+        )
+        totals = cells[key]
+        totals["lines"] += 1
+        totals["units"] += line.volume
+        mrp_total, wsp_total = line.totals()
+        totals["mrp_total"] += mrp_total
+        totals["wsp_total"] += wsp_total
+        if delivered:
+            totals["delivered_lines"] += 1
+            totals["delivered_units"] += line.volume
+    return cells
+
+
+def add_sales(cells, sign=1, fields=SALES_FIELDS):
+    for (day, region, brand_id, category_id), totals in cells.items():
+        cell = {
+            "day": day,
+            "region": region,
+            "brand_id": brand_id,
+            "category_id": category_id,
+        }
+        amounts = {field: sign * totals[field] for field in fields}
+        changes = {field: F(field) + amount for field, amount in amounts.items()}
+        if DailySales.objects.filter(**cell).update(**changes):
+            continue
+        try:
+            with transaction.atomic():
+                DailySales.objects.create(**cell, **amounts)
+        except IntegrityError:
+            # Another order created the row first
+            DailySales.objects.filter(**cell).update(**changes)
+
+
+def record_order(order, lines):
+    add_sales(sales_cells(lines, order.delivered))
+
+
+def record_delivery(order):
+    """Count an order's lines as delivered, or not any more."""
+    sign = 1 if order.delivered else -1
+    add_sales(sales_cells(order.lines.all(), True), sign, DELIVERY_FIELDS)
+
+
+def remove_order(order):
+    add_sales(sales_cells(order.lines.all(), order.delivered), -1)
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def rebuild_daily_sales(since=None, until=None):
+    """
+    Recompute the DailySales rows of a date range (inclusive, open ended
+    when left out) from OrderLine. Returns the number of rows written.
+    """
+    lines = OrderLine.objects.all()
+    sales = DailySales.objects.all()
+    # Datetime bounds rather than __date, which SQLite evaluates per row
+    if since:
+        lines = lines.filter(date__gte=day_start(since))
+        sales = sales.filter(day__gte=since)
+    if until:
+        lines = lines.filter(date__lt=day_start(until + timedelta(days=1)))
+        sales = sales.filter(day__lte=until)
+
+    delivered = Q(order__delivered=True)
+    money = DecimalField(max_digits=14, decimal_places=2)
+    rows = lines.values(
+        "brand_id",
+        "category_id",
+        line_day=TruncDate("date"),
+        line_region=Coalesce("region", Value("")),
+    ).annotate(
+        lines=Count("id"),
+        units=Sum("volume"),
+        mrp_total=Sum(F("mrp") * F("volume"), output_field=money, default=0),
+        wsp_total=Sum(
+            Round(F("wsp") * F("volume") * (100 - F("discount")) / 100, 2),
+            output_field=money,
+            default=0,
+        ),
+        delivered_lines=Count("id", filter=delivered),
+        delivered_units=Sum("volume", filter=delivered, default=0),
+    )
+
+    with transaction.atomic():
+        sales.delete()
+        created = DailySales.objects.bulk_create(
+            (
+                DailySales(
+                    day=row.pop("line_day"), region=row.pop("line_region"), **row
+                )
+                for row in rows
+            ),
+            batch_size=1000,
+        )
+    return len(created)
+
+
+def sales_report(since, until, group_by, region=None, brand=None, category=None):
+    """Summed DailySales rows between two dates, grouped by REPORT_DIMENSIONS."""
+    sales = DailySales.objects.filter(day__range=(since, until))
+    if region:
+        sales = sales.filter(region=region)
+    if brand:
+        sales = sales.filter(brand__name=brand)
+    if category:
+        sales = sales.filter(category__name=category)
+
+    fields = [REPORT_DIMENSIONS[dimension] for dimension in group_by]
+    rows = list(
+        sales.values(*fields)
+        .annotate(**{f"total_{field}": Sum(field) for field in SALES_FIELDS})
+        .order_by(*fields)
+    )
+
+    names = {}
+    for dimension, model in NAMED_DIMENSIONS.items():
+        if dimension in group_by:
+            ids = {row[REPORT_DIMENSIONS[dimension]] for row in rows}
+            names[dimension] = dict(
+                model.objects.filter(pk__in=ids).values_list("pk", "name")
+            )
+
+    results = []
+    for row in rows:
+        result = {}
+        for dimension in group_by:
+            value = row[REPORT_DIMENSIONS[dimension]]
+            result[dimension] = (
+                names[dimension].get(value) if dimension in names else value
+            )
+        for field in SALES_FIELDS:
+            result[field] = row[f"total_{field}"]
+        results.append(result)
+    return results
@@ -8,3 +8,68 @@
 # def create_customer_user(sender, instance, created, **kwargs):
 #     if created:
 #         CustomerUser.objects.create(email=instance.email)
+
+
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .identity import identities
+from .models import CustomerUser, Orders
+from .sales import record_delivery, remove_order
+
+
+# WAL lets checkouts read while another one holds the write lock
+@receiver(connection_created)
+def enable_sqlite_wal(sender, connection, **kwargs):
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode=WAL;")
+
+
+@receiver(pre_save, sender=CustomerUser)
+def remember_email(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and "email" not in update_fields:
+        return
+    instance._old_email = (
+        CustomerUser.objects.filter(pk=instance.pk)
+        .values_list("email", flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=CustomerUser)
+@receiver(post_delete, sender=CustomerUser)
+def forget_identity(sender, instance, **kwargs):
+    identities.discard(instance.email)
+    # After an email change the old address' entry would outlive the save
+    old_email = getattr(instance, "_old_email", None)
+    if old_email and old_email != instance.email:
+        identities.discard(old_email)
+
+
+@receiver(pre_save, sender=Orders)
+def remember_delivered(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    instance._was_delivered = (
+        Orders.objects.filter(pk=instance.pk)
+        .values_list("delivered", flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Orders)
+def update_delivered_sales(sender, instance, raw=False, created=False, **kwargs):
+    was_delivered = getattr(instance, "_was_delivered", None)
+    if raw or created or was_delivered in (None, instance.delivered):
+        return
+    record_delivery(instance)
+
+
+# Before the lines go with it
+@receiver(pre_delete, sender=Orders)
+def remove_order_sales(sender, instance, **kwargs):
+    remove_order(instance)
@@ -1,3 +1,519 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from itertools import product as combinations
+from types import SimpleNamespace
+from unittest import mock
+from uuid import UUID
 
-# Create your tests here.
+from django.apps import apps
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from django.core.exceptions import ValidationError
+from django.forms import inlineformset_factory
+
+from products.admin import StockItemSizeFormSet
+from products.cache import catalog_cache
+from products.models import (
+    Brand,
+    Category,
+    Product,
+    StockItem,
+    StockItemSize,
+    validate_stock_total,
+)
+from .cart import CART_FIELDS, cart_entries, cart_entry, hydrate_cart
+from .checkout import OutOfStock, place_order
+from .management.commands.backfill_order_totals import order_totals
+from .identity import identities, resolve_identity
+from .models import (
+    CartItem,
+    CustomerUser,
+    DailySales,
+    OrderLine,
+    Orders,
+    line_totals,
+)
+from .sales import SALES_FIELDS, rebuild_daily_sales
+from .views import generate_access_token
+
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+    threads = 8
+    customers = 40
+    stock = 10
+
+    def setUp(self):
+        product = Product.objects.create(
+            title="Stress product", gender="Men", go_live_date=timezone.now()
+        )
+        self.stock_item = StockItem.objects.create(
+            product=product, key="stress", title="Stress pack", total=self.stock
+        )
+        CustomerUser.objects.bulk_create(
+            CustomerUser(email=f"stress-{index}@example.com", first_name=str(index))
+            for index in range(self.customers)
+        )
+        self.user_ids = list(CustomerUser.objects.values_list("pk", flat=True))
+        CartItem.objects.bulk_create(
+            CartItem(
+                user_id=user_id,
+                stock_id=str(self.stock_item.pk),
+                item_id=str(product.pk),
+                volume=1,
+            )
+            for user_id in self.user_ids
+        )
+
+    def checkout(self, user_id):
+        try:
+            place_order(CustomerUser.objects.get(pk=user_id))
+            return "placed"
+        except OutOfStock:
+            return "out_of_stock"
+        except OperationalError as error:
+            return f"error: {error}"
+        finally:
+            connection.close()
+
+    def test_concurrent_checkouts_never_oversell(self):
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            results = list(executor.map(self.checkout, self.user_ids))
+
+        self.stock_item.refresh_from_db()
+        self.assertEqual(results.count("placed"), self.stock)
+        self.assertEqual(results.count("out_of_stock"), self.customers - self.stock)
+        self.assertEqual(Orders.objects.count(), self.stock)
+        self.assertEqual(self.stock_item.total, 0)
+        # Only the ordered customers' carts were cleared
+        self.assertEqual(CartItem.objects.count(), self.customers - self.stock)
+
+    def test_only_selling_out_bumps_the_catalog_version(self):
+        StockItem.objects.filter(pk=self.stock_item.pk).update(total=2)
+        version = catalog_cache.state()[0]
+
+        place_order(CustomerUser.objects.get(pk=self.user_ids[0]))
+        self.assertEqual(catalog_cache.state()[0], version)
+
+        place_order(CustomerUser.objects.get(pk=self.user_ids[1]))
+        self.assertGreater(catalog_cache.state()[0], version)
+
+    def test_sold_stock_item_stays_valid(self):
+        StockItemSize.objects.bulk_create(
+            [
+                StockItemSize(stock_item=self.stock_item, size="S", qty=4),
+                StockItemSize(stock_item=self.stock_item, size="M", qty=6),
+            ]
+        )
+        place_order(CustomerUser.objects.get(pk=self.user_ids[0]))
+
+        self.stock_item.refresh_from_db()
+        quantities = list(self.stock_item.sizes.values_list("qty", flat=True))
+        self.assertEqual(self.stock_item.total, self.stock - 1)
+        validate_stock_total(
+            self.stock_item.title, self.stock_item.total, quantities, sold=True
+        )
+        with self.assertRaises(ValidationError):
+            validate_stock_total(
+                self.stock_item.title, self.stock + 1, quantities, sold=True
+            )
+
+
+class IdentityCacheTests(TestCase):
+    def test_email_change_forgets_both_addresses(self):
+        user = CustomerUser.objects.create(email="old@example.com", region="south")
+        resolve_identity("old@example.com")
+
+        user.email = "new@example.com"
+        user.save()
+
+        self.assertIsNone(identities.get("old@example.com"))
+        self.assertIsNone(identities.get("new@example.com"))
+        with self.assertRaises(CustomerUser.DoesNotExist):
+            resolve_identity("old@example.com")
+
+
+class StockItemSizeFormSetTests(TestCase):
+    FormSet = inlineformset_factory(
+        StockItem, StockItemSize, formset=StockItemSizeFormSet, fields=["size", "qty"]
+    )
+
+    def setUp(self):
+        product = Product.objects.create(
+            title="Kurta", gender="Men", go_live_date=timezone.now()
+        )
+        self.stock_item = StockItem.objects.create(
+            product=product, key="g1", title="Pack", total=3
+        )
+
+    def formset(self, quantities):
+        data = {
+            "sizes-TOTAL_FORMS": len(quantities),
+            "sizes-INITIAL_FORMS": 0,
+        }
+        for index, (size, qty) in enumerate(quantities.items()):
+            data[f"sizes-{index}-size"] = size
+            data[f"sizes-{index}-qty"] = qty
+        return self.FormSet(data, instance=self.stock_item, prefix="sizes")
+
+    def test_unsold_total_has_to_match_the_sizes(self):
+        self.assertFalse(self.formset({"S": 2, "M": 3}).is_valid())
+        self.assertTrue(self.formset({"S": 1, "M": 2}).is_valid())
+
+    def test_sold_total_may_be_below_the_sizes(self):
+        order = Orders.objects.create(name="a@example.com", date=timezone.now())
+        OrderLine.objects.create(
+            order=order, stock_item_id=self.stock_item.pk, volume=2, date=order.date
+        )
+
+        self.assertTrue(self.formset({"S": 2, "M": 3}).is_valid())
+        self.assertFalse(self.formset({"S": 1, "M": 1}).is_valid())
+
+
+class CartTests(TestCase):
+    def setUp(self):
+        self.user = CustomerUser.objects.create(email="cart@example.com")
+        self.client.defaults["HTTP_AUTHORIZATION"] = "Bearer " + generate_access_token(
+            self.user.email
+        )
+        self.products, self.stock_items = [], []
+        for key in ("a", "b"):
+            product = Product.objects.create(
+                title=f"Product {key}", gender="Men", go_live_date=timezone.now()
+            )
+            stock_item = StockItem.objects.create(
+                product=product, key=key, title=f"Pack {key}", total=5
+            )
+            StockItemSize.objects.create(stock_item=stock_item, size="S", qty=5)
+            self.products.append(product)
+            self.stock_items.append(stock_item)
+
+    def save(self, index, volume=1):
+        return self.client.post(
+            "/customers/cart/save/",
+            {
+                "stock_id": str(self.stock_items[index].pk),
+                "post_id": str(self.products[index].pk),
+                "volume": volume,
+            },
+            content_type="application/json",
+        )
+
+    def test_add_item(self):
+        self.assertEqual(self.save(0, volume=2).json(), {"Message": "Item added"})
+
+        self.assertEqual(
+            cart_entries(self.user.pk),
+            [
+                {
+                    "stock_id": str(self.stock_items[0].pk),
+                    "item_id": str(self.products[0].pk),
+                    "volume": 2,
+                }
+            ],
+        )
+
+    def test_duplicate_item_is_not_added(self):
+        self.save(0, volume=2)
+
+        response = self.save(0, volume=3)
+
+        self.assertEqual(response.json(), {"Message": "Item already in cart"})
+        self.assertEqual([entry["volume"] for entry in cart_entries(self.user.pk)], [2])
+        # The failed insert left the request's transaction usable
+        self.assertEqual(self.save(1).json(), {"Message": "Item added"})
+
+    def test_remove_item(self):
+        self.save(0)
+        self.save(1)
+
+        response = self.client.post(
+            "/customers/cart/update/",
+            {"stock_id": str(self.stock_items[0].pk)},
+            content_type="application/json",
+        )
+
+        self.assertEqual(
+            [entry["stock_id"] for entry in response.json()["cart_data"]],
+            [str(self.stock_items[1].pk)],
+        )
+        self.assertEqual(CartItem.objects.count(), 1)
+
+    def test_hydrate_cart(self):
+        entries = [
+            cart_entry(stock_item.pk, product.pk, 1)
+            for stock_item, product in zip(self.stock_items, self.products)
+        ]
+        # A stock item of another product resolves to no stock group
+        entries.append(cart_entry(self.stock_items[1].pk, self.products[0].pk, 1))
+
+        # Products, stock items and their sizes, whatever the cart size
+        with self.assertNumQueries(3):
+            lines = hydrate_cart(entries)
+
+        self.assertEqual(
+            [line.product for line in lines], [*self.products, self.products[0]]
+        )
+        self.assertEqual([line.stock_item for line in lines], [*self.stock_items, None])
+        self.stock_items[0].refresh_from_db()
+        self.assertEqual(lines[0].stock_group, self.stock_items[0].to_stock_group())
+        self.assertIsNone(lines[2].stock_group)
+
+    def test_hydrate_cart_with_a_missing_product(self):
+        self.save(0)
+        self.products[0].delete()
+
+        with self.assertRaises(Product.DoesNotExist):
+            hydrate_cart(cart_entries(self.user.pk))
+
+
+class CopyCartsMigrationTests(TestCase):
+    def test_json_carts_are_copied(self):
+        migration = import_module("customers.migrations.0005_cart_items")
+        CustomerUser.objects.create(
+            email="json@example.com",
+            cart=[
+                {"stock_id": "s1", "item_id": "p1", "volume": 2},
+                # Duplicate, the first entry wins
+                {"stock_id": "s1", "item_id": "p1", "volume": 5},
+                {"stock_id": "s2", "item_id": "p2", "volume": "3"},
+                {"stock_id": "s3", "item_id": "p3", "volume": "many"},
+                {"stock_id": "s4", "item_id": "p4", "volume": 0},
+                {"stock_id": "", "item_id": "p5", "volume": 1},
+                {"stock_id": "s6" * 40, "item_id": "p6", "volume": 1},
+                {"item_id": "p7", "volume": 1},
+                "s8",
+                None,
+            ],
+        )
+        CustomerUser.objects.create(email="empty@example.com", cart=None)
+
+        migration.copy_carts(apps, None)
+
+        self.assertEqual(
+            list(CartItem.objects.values_list("user__email", *CART_FIELDS)),
+            [("json@example.com", "s1", "p1", 2), ("json@example.com", "s2", "p2", 3)],
+        )
+
+
+def fill_cart(user, lines):
+    """A product and stock item per (mrp, wsp, discount, volume), in the cart."""
+    brand = Brand.objects.get_or_create(name="Brand", slug="brand")[0]
+    category = Category.objects.get_or_create(name="Kurta", slug="kurta")[0]
+    for index, (mrp, wsp, discount, volume) in enumerate(
+        lines, start=Product.objects.count()
+    ):
+        product = Product.objects.create(
+            title=f"Product {index}",
+            gender="Men",
+            go_live_date=timezone.now(),
+            brand=brand,
+            category=category,
+            mrp=Decimal(mrp),
+            wsp=Decimal(wsp),
+        )
+        stock_item = StockItem.objects.create(
+            product=product,
+            key="g1",
+            title="Pack",
+            total=10,
+            discount=Decimal(discount),
+        )
+        CartItem.objects.create(
+            user=user,
+            stock_id=str(stock_item.pk),
+            item_id=str(product.pk),
+            volume=volume,
+        )
+
+
+def number(value):
+    """A snapshot value as line_totals takes it, None if it isn't a number."""
+    try:
+        return Decimal(str(value))
+    except ArithmeticError:
+        return None
+
+
+def cents(amount):
+    return int(amount * 100)
+
+
+class OrderTotalsTests(TestCase):
+    def test_totals_match_line_totals(self):
+        values = combinations(
+            ["100", "19.99", "0.05", 250, 99.5, None, "", "n/a"],
+            ["60", "12.34", "0.01", 33.33, None],
+            [1, 3, "7"],
+            ["0", "10", "12.5", "33.33", "0.01", 5, None],
+        )
+        items = []
+        for mrp, wsp, volume, discount in values:
+            item = {"mrp": mrp, "wsp": wsp, "volume": volume, "discount": discount}
+            # None stands for a key missing from the snapshot
+            items.append(
+                {key: value for key, value in item.items() if value is not None}
+            )
+
+        total_mrp, total_wsp = order_totals(
+            [SimpleNamespace(items=[item]) for item in items]
+        )
+
+        for item, mrp_cents, wsp_cents in zip(items, total_mrp, total_wsp):
+            with self.subTest(**item):
+                mrp, wsp = line_totals(
+                    *(number(item.get(key)) for key in ("mrp", "wsp")),
+                    int(item["volume"]),
+                    number(item.get("discount")),
+                )
+                self.assertEqual((mrp_cents, wsp_cents), (cents(mrp), cents(wsp)))
+
+    def test_orders_without_lines(self):
+        orders = [
+            SimpleNamespace(items=[""]),
+            SimpleNamespace(items=[]),
+            SimpleNamespace(items=None),
+            SimpleNamespace(items=[{"mrp": "10", "wsp": "5", "volume": 2}]),
+        ]
+
+        total_mrp, total_wsp = order_totals(orders)
+
+        self.assertEqual(list(total_mrp), [0, 0, 0, 2000])
+        self.assertEqual(list(total_wsp), [0, 0, 0, 1000])
+
+    def test_totals_match_placed_orders(self):
+        user = CustomerUser.objects.create(email="totals@example.com")
+        fill_cart(
+            user, [("999.99", "333.33", "12.5", 3), ("19.95", "7.77", "33.33", 7)]
+        )
+
+        order = Orders.objects.get(pk=place_order(user).pk)
+        total_mrp, total_wsp = order_totals([order])
+
+        self.assertEqual(
+            (total_mrp[0], total_wsp[0]),
+            (cents(order.total_mrp), cents(order.total_wsp)),
+        )
+
+
+def item_values(item):
+    return (
+        UUID(item["product_id"]),
+        UUID(item["stock_id"]),
+        int(item["volume"]),
+        Decimal(item["mrp"]),
+        Decimal(item["wsp"]),
+        Decimal(item["discount"]),
+    )
+
+
+LINE_FIELDS = ("product_id", "stock_item_id", "volume", "mrp", "wsp", "discount")
+
+
+class OrderLineTests(TestCase):
+    def setUp(self):
+        self.user = CustomerUser.objects.create(email="lines@example.com")
+
+    def place_order(self):
+        fill_cart(self.user, [("120.00", "80.50", "12.5", 2), ("45", "30", "0", 1)])
+        return place_order(self.user)
+
+    def assertLinesMatchItems(self, order):
+        order = Orders.objects.get(pk=order.pk)
+        lines = order.lines.order_by("pk")
+        self.assertEqual(
+            list(lines.values_list(*LINE_FIELDS)),
+            [item_values(item) for item in order.items],
+        )
+        for line in lines:
+            product = Product.objects.get(pk=line.product_id)
+            self.assertEqual(
+                (line.brand_id, line.category_id),
+                (product.brand_id, product.category_id),
+            )
+            self.assertEqual((line.region, line.date), (order.region, order.date))
+
+    def test_checkout_lines_match_the_snapshot(self):
+        order = self.place_order()
+
+        self.assertEqual(order.lines.count(), 2)
+        self.assertLinesMatchItems(order)
+
+    def test_backfilled_lines_match_the_snapshot(self):
+        order = self.place_order()
+        OrderLine.objects.all().delete()
+
+        call_command("backfill_order_lines", stdout=StringIO())
+
+        self.assertEqual(order.lines.count(), 2)
+        self.assertLinesMatchItems(order)
+
+    def test_rerun_skips_orders_with_lines(self):
+        order = self.place_order()
+        OrderLine.objects.all().delete()
+        call_command("backfill_order_lines", stdout=StringIO())
+        first_pks = list(OrderLine.objects.values_list("pk", flat=True))
+
+        call_command("backfill_order_lines", stdout=StringIO())
+
+        self.assertEqual(
+            list(OrderLine.objects.values_list("pk", flat=True)), first_pks
+        )
+        self.assertLinesMatchItems(order)
+
+    def test_placeholder_orders_get_no_lines(self):
+        Orders.objects.create(name="a@example.com", date=timezone.now())
+        Orders.objects.create(name="b@example.com", date=timezone.now(), items=[])
+        order = self.place_order()
+        OrderLine.objects.all().delete()
+
+        call_command("backfill_order_lines", stdout=StringIO())
+
+        self.assertEqual(
+            list(OrderLine.objects.values_list("order_id", flat=True).distinct()),
+            [order.pk],
+        )
+        self.assertLinesMatchItems(order)
+
+
+class DailySalesTests(TestCase):
+    def place_order(self, user, lines, date):
+        fill_cart(user, lines)
+        with mock.patch("customers.checkout.timezone.now", return_value=date):
+            return place_order(user)
+
+    def daily_sales(self):
+        fields = ["day", "region", "brand_id", "category_id", *SALES_FIELDS]
+        rows = DailySales.objects.order_by(*fields[:4]).values_list(*fields)
+        # Rows emptied by deleted orders count as no row
+        return [row for row in rows if any(row[4:])]
+
+    def test_incremental_rollups_match_a_rebuild(self):
+        north = CustomerUser.objects.create(email="north@example.com", region="north")
+        anywhere = CustomerUser.objects.create(email="anywhere@example.com")
+        south = CustomerUser.objects.create(email="south@example.com", region="south")
+        today = timezone.now()
+        yesterday = today - timedelta(days=1)
+
+        first = self.place_order(north, [("120.00", "80.55", "12.5", 3)], today)
+        second = self.place_order(north, [("45", "30.01", "33.33", 1)], today)
+        third = self.place_order(anywhere, [("999.99", "0.05", "0", 7)], yesterday)
+        self.place_order(anywhere, [("10", "5", "50", 2)], yesterday)
+        only = self.place_order(south, [("10", "5", "0", 1)], yesterday)
+
+        for order, delivered in [(first, True), (third, True), (first, False)]:
+            order.delivered = delivered
+            order.save()
+        second.delete()
+        only.delete()
+
+        incremental = self.daily_sales()
+        rebuild_daily_sales()
+
+        self.assertEqual(incremental, self.daily_sales())
+        self.assertEqual(len(incremental), 2)
@@ -12,4 +12,5 @@ urlpatterns = [
     path("cart/save/", views.SaveCartView.as_view(), name="save_cart"),
     path("cart/update/", views.UpdateCartView.as_view(), name="update_cart"),
     path("order/", views.PlaceOrder.as_view(), name="place_order"),
+    path("sales/report/", views.SalesReport.as_view(), name="sales_report"),
 ]
@@ -1,21 +1,28 @@
 from rest_framework import status
+from rest_framework.exceptions import ParseError
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
 from django.contrib.auth import login, authenticate
 from django.conf import settings
 from django.utils import timezone
-from datetime import datetime, timedelta
-from decimal import Decimal
-from uuid import UUID
+from datetime import date, datetime, timedelta
 
 from products.models import Product
-from .models import Orders
+from .cart import (
+    PRODUCT_FIELDS,
+    add_to_cart,
+    cart_entries,
+    cart_entry,
+    hydrate_cart,
+    remove_from_cart,
+)
+from .checkout import OutOfStock, place_order
+from .identity import get_identity
+from .sales import REPORT_DIMENSIONS, sales_report
 from .forms import CustomerUser, CustomerUserCreationForm
-from .middleware import TokenAuthenticationMiddleware
 from . import serializers
 
-import json
 import jwt
 
 
@@ -146,7 +153,7 @@ def generate_access_token(user):
 
 class RefreshTokenView(APIView):
     def post(self, request):
-        data = json.loads(request.body)
+        data = request.data
         refresh_token = data.get("refresh_token")
 
         if validate_refresh_token(refresh_token):
@@ -175,7 +182,7 @@ class LogoutView(APIView):
 class SaveCartView(APIView):
     def post(self, request):
         try:
-            data = json.loads(request.body)
+            data = request.data
             stock_id = data.get("stock_id")
             item_id = data.get("post_id")
             volume = data.get("volume")
@@ -186,24 +193,16 @@ class SaveCartView(APIView):
                     {"error": "Invalid data format"}, status=status.HTTP_400_BAD_REQUEST
                 )
 
-            json_data = {"stock_id": stock_id, "item_id": item_id, "volume": volume}
-            active_user = CustomerUser.objects.get(email=user_id)
-            userdata_fields = [field.name for field in CustomerUser._meta.get_fields()]
-            cart_data = active_user.cart
-
-            # Checking if cart_data is None, if so initialize it with an empty list
-            if cart_data is None:
-                cart_data = []
-
-            for item in cart_data:
-                if item["stock_id"] == stock_id:
-                    return Response(
-                        {"Message": "Item already in cart"}, status=status.HTTP_200_OK
-                    )
+            entry = cart_entry(stock_id, item_id, volume)
+            if entry is None:
+                return Response(
+                    {"error": "Invalid data format"}, status=status.HTTP_400_BAD_REQUEST
+                )
 
-            cart_data.append(json_data)
-            active_user.cart = cart_data
-            active_user.save()
+            if not add_to_cart(get_identity(request).pk, entry):
+                return Response(
+                    {"Message": "Item already in cart"}, status=status.HTTP_200_OK
+                )
 
             return Response({"Message": "Item added"}, status=status.HTTP_200_OK)
 
@@ -211,7 +210,7 @@ class SaveCartView(APIView):
             return Response(
                 {"error": "User not found"}, status=status.HTTP_404_NOT_FOUND
             )
-        except json.JSONDecodeError:
+        except ParseError:
             return Response(
                 {"error": "Invalid JSON data"}, status=status.HTTP_400_BAD_REQUEST
             )
@@ -223,8 +222,7 @@ class FetchCart(APIView):
 
         try:
             if user_id:
-                active_user = CustomerUser.objects.get(email=user_id)
-                cart_data = active_user.cart
+                cart_data = cart_entries(get_identity(request).pk)
                 return Response({"cart_data": cart_data}, status=status.HTTP_200_OK)
             else:
                 return Response(
@@ -240,42 +238,35 @@ class FetchCart(APIView):
 
 class FetchCartData(APIView):
     def get(self, request):
-        user_id = getattr(request, "user_id", None)
-        product_fields = [field.name for field in Product._meta.get_fields()]
         cart_data = []
-        stock_data = []
 
         try:
-            active_user = CustomerUser.objects.get(email=user_id)
-            cart_items = active_user.cart
-
-            for item in cart_items:
-                try:
-                    obj = Product.objects.get(id=item["item_id"])
-                    data = {}
-                    for field in product_fields:
-                        value = getattr(obj, field)
-                        if field == "uploaded_by":
-                            data[field] = value.username if value else None
-                        elif field == "stock_items":
-                            for i in value:
-                                if value[i]["id"] == item["stock_id"]:
-                                    data[field] = value[i]
-                        elif hasattr(value, "name"):
-                            data[field] = value.name
-                        else:
-                            data[field] = value
-
-                    cart_data.append(data)
-
-                except Product.DoesNotExist:
-                    return Response(
-                        {"error": "Product not found."},
-                        status=status.HTTP_404_NOT_FOUND,
-                    )
+            cart_lines = hydrate_cart(cart_entries(get_identity(request).pk))
+
+            for line in cart_lines:
+                data = {}
+                for field in PRODUCT_FIELDS:
+                    value = getattr(line.product, field)
+                    if field == "uploaded_by":
+                        data[field] = value.username if value else None
+                    elif field == "stock_items":
+                        if line.stock_group is not None:
+                            data[field] = line.stock_group
+                    elif hasattr(value, "name"):
+                        data[field] = value.name
+                    else:
+                        data[field] = value
+
+                cart_data.append(data)
 
             return Response({"cart_data": cart_data}, status=status.HTTP_200_OK)
 
+        except Product.DoesNotExist:
+            return Response(
+                {"error": "Product not found."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
         except CustomerUser.DoesNotExist:
             print("Object not found.")
             return Response(
@@ -286,7 +277,7 @@ class FetchCartData(APIView):
 class UpdateCartView(APIView):
     def post(self, request):
         try:
-            data = json.loads(request.body)
+            data = request.data
             stock_id = data.get("stock_id")
             user_id = getattr(request, "user_id", None)
 
@@ -295,15 +286,9 @@ class UpdateCartView(APIView):
                     {"error": "Invalid data format"}, status=status.HTTP_400_BAD_REQUEST
                 )
 
-            active_user = CustomerUser.objects.get(email=user_id)
-            cart_data = active_user.cart
-
-            updated_cart_data = [
-                item for item in cart_data if item["stock_id"] != stock_id
-            ]
-
-            active_user.cart = updated_cart_data
-            active_user.save()
+            identity = get_identity(request)
+            remove_from_cart(identity.pk, stock_id)
+            updated_cart_data = cart_entries(identity.pk)
 
             return Response({"cart_data": updated_cart_data}, status=status.HTTP_200_OK)
 
@@ -312,100 +297,76 @@ class UpdateCartView(APIView):
             return Response(
                 {"error": "User not found"}, status=status.HTTP_404_NOT_FOUND
             )
-        except json.JSONDecodeError:
+        except ParseError:
             return Response(
                 {"error": "Invalid JSON data"}, status=status.HTTP_400_BAD_REQUEST
             )
 
 
-class JsonEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return str(obj)  # Convert Decimal to string
-        if isinstance(obj, UUID):
-            return str(obj)  # Convert UUID to string
-        if isinstance(obj, datetime):
-            return obj.strftime("%Y-%m-%d %H:%M:%S")  # Convert datetime to string
-        return super().default(obj)
-
-
 class PlaceOrder(APIView):
     def get(self, request):
-        user_id = getattr(request, "user_id", None)
-        product_fields = [field.name for field in Product._meta.get_fields()]
-        item_list = []
         try:
-            active_user = CustomerUser.objects.get(email=user_id)
-            active_cart_data = active_user.cart
-            for item in active_cart_data:
-                item_id = item["item_id"]
-                try:
-                    obj = Product.objects.get(id=item_id)
-                    data = {}
-                    for field in product_fields:
-                        value = getattr(obj, field)
-                        if field == "uploaded_by":
-                            data[field] = value.username if value else None
-                        elif field == "stock_items":
-                            for i in value:
-                                if value[i]["id"] == item["stock_id"]:
-                                    data["total_items"] = value[i]["total"]
-                                    data["stock_title"] = value[i]["title"]
-                                    data["stock_id"] = str(value[i]["id"])
-                                    data["discount"] = value[i]["discount"]
-                                    data["items"] = value[i]["items"]
-                                    if value[i]["total"]:
-                                        if int(value[i]["total"]) < item["volume"]:
-                                            return Response(
-                                                {
-                                                    "error": f"{value[i]['title']} is Out Of Stock."
-                                                },
-                                                status=status.HTTP_200_OK,
-                                            )
-                                        else:
-                                            data["volume"] = item["volume"]
-
-                        elif hasattr(value, "name"):
-                            data[field] = value.name
-                        else:
-                            if (
-                                type(value) == UUID
-                                or type(value) == Decimal
-                                or type(value) == datetime
-                            ):
-                                if field == "id":
-                                    data["product_id"] = str(value)
-                                else:
-                                    data[field] = str(value)
-                            else:
-                                data[field] = value
-                    item_list.append(data)
-
-                except Product.DoesNotExist:
-                    return Response(
-                        {"error": "Product not found."},
-                        status=status.HTTP_404_NOT_FOUND,
-                    )
-
-            name = active_user.email
-            region = active_user.region
-            date = timezone.now()
-            items = item_list
-
-            # another approach to jsonfield but with "\n" & "\"
-            # items = json.dumps(item_list, cls=JsonEncoder, indent=4)
-
-            order = Orders(name=name, region=region, date=date, items=items)
-            order.save()
-
-            # clearing cart after placing order
-            active_user.cart = active_user.cart.clear()
-            active_user.save()
+            # The cached identity has everything checkout needs
+            place_order(get_identity(request))
 
             return Response(status=status.HTTP_200_OK)
 
+        except OutOfStock as error:
+            return Response({"error": str(error)}, status=status.HTTP_200_OK)
+
+        except Product.DoesNotExist:
+            return Response(
+                {"error": "Product not found."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
         except CustomerUser.DoesNotExist:
             print("Object not found.")
             return Response(
                 {"error": "Error occured"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+def report_date(request, name, default):
+    value = request.GET.get(name)
+    if not value:
+        return default
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a YYYY-MM-DD date")
+
+
+class SalesReport(APIView):
+    def get(self, request):
+        try:
+            if not get_identity(request).is_staff:
+                return Response(
+                    {"error": "Staff only"}, status=status.HTTP_403_FORBIDDEN
+                )
+
+            until = report_date(request, "until", timezone.localdate())
+            since = report_date(request, "since", until - timedelta(days=30))
+            group_by = request.GET.get("group_by", "day").split(",")
+            for dimension in group_by:
+                if dimension not in REPORT_DIMENSIONS:
+                    raise ValueError("group_by takes " + ", ".join(REPORT_DIMENSIONS))
+
+            results = sales_report(
+                since,
+                until,
+                group_by,
+                request.GET.get("region"),
+                request.GET.get("brand"),
+                request.GET.get("category"),
+            )
+
+            return Response({"results": results}, status=status.HTTP_200_OK)
+
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        except CustomerUser.DoesNotExist:
+            return Response(
+                {"error": "User not found"}, status=status.HTTP_404_NOT_FOUND
+            )
@@ -1,8 +1,19 @@
+from django.apps import apps
 from django.db import models
 from django.contrib import admin
-from django.forms import ModelForm
-from django.core.exceptions import ValidationError
-from .models import Category, Product, Brand, Brick, Collection
+from django.forms import BaseInlineFormSet
+from .models import (
+    Category,
+    Product,
+    Brand,
+    Brick,
+    Collection,
+    Gender,
+    Region,
+    StockItem,
+    StockItemSize,
+    validate_stock_total,
+)
 
 
 # Register your models here.
@@ -15,31 +26,89 @@ class CategoryAdmin(admin.ModelAdmin):
     prepopulated_fields = {"slug": ("name",)}
 
 
-class PriceForm(ModelForm):
-    class Meta:
-        model = Product
-        fields = "__all__"
+@admin.register(Gender)
+@admin.register(Region)
+class RegionAdmin(admin.ModelAdmin):
+    list_display = ["name"]
+    search_fields = ["name"]
 
+
+def has_sales(stock_item):
+    """Whether any order line took units of stock_item."""
+    if stock_item.pk is None or stock_item._state.adding:
+        return False
+    # Through the app registry, customers builds on products and not the
+    # other way around
+    OrderLine = apps.get_model("customers", "OrderLine")
+    return OrderLine.objects.filter(stock_item_id=stock_item.pk).exists()
+
+
+class StockItemSizeFormSet(BaseInlineFormSet):
     def clean(self):
-        stock_items = self.cleaned_data["stock_items"]
+        super().clean()
+        if any(self.errors):
+            return
+
+        quantities = [
+            form.cleaned_data["qty"]
+            for form in self.forms
+            if form.cleaned_data and not form.cleaned_data.get("DELETE")
+        ]
+        validate_stock_total(
+            self.instance.title,
+            self.instance.total,
+            quantities,
+            sold=has_sales(self.instance),
+        )
 
-        # Constraints here
-        if stock_items != [""]:
-            for group in stock_items:
-                quantity = 0
-                total = stock_items[group]["total"]
-                for item in stock_items[group]["items"]:
-                    quantity += int(stock_items[group]["items"][item]["qty"])
-                if quantity != int(stock_items[group]["total"]):
-                    raise ValidationError(
-                        f"Error: you've provided Item: \"{stock_items[group]['title']}\" with Total = \"{int(stock_items[group]['total'])}\", which doesn't matches with the item counts. Please check the items \"qty\" or update the \"total\" value."
-                    )
 
-        return self.cleaned_data
+class StockItemSizeInline(admin.TabularInline):
+    model = StockItemSize
+    formset = StockItemSizeFormSet
+    extra = 0
+
+
+@admin.register(StockItem)
+class StockItemAdmin(admin.ModelAdmin):
+    inlines = [StockItemSizeInline]
+    list_display = ["title", "product", "key", "total", "discount"]
+    list_select_related = ["product"]
+    search_fields = ["title", "product__title"]
+    readonly_fields = ["id"]
+
+
+class StockItemInlineFormSet(BaseInlineFormSet):
+    def clean(self):
+        super().clean()
+        if any(self.errors):
+            return
+
+        # Sizes are edited on the stock item page, only recheck changed totals
+        for form in self.forms:
+            instance = form.instance
+            if not instance.pk or "total" not in form.changed_data:
+                continue
+            if form.cleaned_data.get("DELETE"):
+                continue
+            quantities = instance.sizes.values_list("qty", flat=True)
+            validate_stock_total(
+                instance.title,
+                instance.total,
+                list(quantities),
+                sold=has_sales(instance),
+            )
+
+
+class StockItemInline(admin.TabularInline):
+    model = StockItem
+    formset = StockItemInlineFormSet
+    fields = ["key", "title", "total", "discount"]
+    show_change_link = True
+    extra = 0
 
 
 class ProductAdmin(admin.ModelAdmin):
-    form = PriceForm
+    inlines = [StockItemInline]
     fieldsets = (
         (None, {"fields": ("id",)}),
         (
@@ -65,6 +134,9 @@ class ProductAdmin(admin.ModelAdmin):
                     "image_2",
                     "image_3",
                     "image_4",
+                    "image_status",
+                    "image_attempts",
+                    "image_error",
                 )
             },
         ),
@@ -99,13 +171,28 @@ class ProductAdmin(admin.ModelAdmin):
         "collection",
         "mrp",
         "is_active",
+        "image_status",
         "go_live_date",
     ]
+    list_filter = ["image_status", "is_active"]
+    actions = ["retry_image_processing"]
     readonly_fields = [
         "id",
         "uploaded_by",
+        "stock_items",
+        "image_status",
+        "image_attempts",
+        "image_error",
     ]
 
+    @admin.action(description="Retry image processing")
+    def retry_image_processing(self, request, queryset):
+        with_images = queryset.exclude(image_1__isnull=True).exclude(image_1="")
+        updated = with_images.update(
+            image_status=Product.IMAGE_PENDING, image_attempts=0, image_error=""
+        )
+        self.message_user(request, f"{updated} products queued for image processing.")
+
     def save_model(self, request, obj, form, change):
         if not obj.uploaded_by:
             obj.uploaded_by = request.user
@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import status
+
+from customers.identity import aget_identity
+from customers.models import CustomerUser
+from shopipy_server.renderers import dumps
+from .catalog import (
+    CATALOG_FIELDS,
+    RELATED_FIELDS,
+    afetch_catalog,
+    afilter_page,
+    catalog_rows,
+    filtered_rows,
+    item_data,
+    newest_first,
+)
+from .conditional import (
+    acatalog_validators,
+    aitem_validators,
+    not_modified,
+    set_validators,
+)
+from .models import Product, parse_regions
+from .pagination import InvalidCursor, KeysetPaginator
+from .streaming import astreaming_response, stream_format
+
+
+# Native async versions of the read-only catalog views, routed in place of
+# the DRF ones when ASYNC_CATALOG_VIEWS is on (the ASGI entry point sets it).
+def json_response(data, status_code=status.HTTP_200_OK):
+    # Same encoding as the DRF views' renderer
+    return HttpResponse(
+        dumps(data), status=status_code, content_type="application/json"
+    )
+
+
+class FetchProducts(View):
+    async def get(self, request):
+        try:
+            identity = await aget_identity(request)
+            active_regions = parse_regions(identity.region)
+
+            etag, last_modified = await acatalog_validators(request, active_regions)
+            unchanged = not_modified(request, etag, last_modified, private=True)
+            if unchanged:
+                return unchanged
+
+            output_format = stream_format(request)
+            if output_format:
+                response = astreaming_response(
+                    catalog_rows(active_regions), output_format
+                )
+                return set_validators(response, etag, last_modified, private=True)
+
+            products_page = await afetch_catalog(
+                active_regions,
+                request.GET.get("cursor"),
+                newest_first.get_page_size(request),
+            )
+
+            response = json_response(products_page)
+            return set_validators(response, etag, last_modified, private=True)
+
+        except InvalidCursor as e:
+            return json_response({"error": str(e)}, status.HTTP_400_BAD_REQUEST)
+
+        except CustomerUser.DoesNotExist:
+            return json_response({"error": "Error occured"}, status.HTTP_404_NOT_FOUND)
+
+
+# For unAuthenticated Users
+class UnAuthFetchProducts(View):
+    paginator = KeysetPaginator("-created", settings.CATALOG_GUEST_PAGE_SIZE)
+
+    async def get(self, request):
+        etag, last_modified = await acatalog_validators(request)
+        unchanged = not_modified(request, etag, last_modified)
+        if unchanged:
+            return unchanged
+
+        products = Product.objects.all().values(*CATALOG_FIELDS)
+
+        try:
+            products_page = await self.paginator.apage(
+                products,
+                request.GET.get("cursor"),
+                self.paginator.get_page_size(request),
+            )
+        except InvalidCursor as e:
+            return json_response({"error": str(e)}, status.HTTP_400_BAD_REQUEST)
+
+        return set_validators(json_response(products_page), etag, last_modified)
+
+
+class FetchItem(View):
+    async def get(self, request, id):
+        etag, last_modified = await aitem_validators(id)
+        unchanged = not_modified(request, etag, last_modified)
+        if unchanged:
+            return unchanged
+
+        try:
+            obj = await Product.objects.select_related(*RELATED_FIELDS).aget(id=id)
+
+            return set_validators(json_response(item_data(obj)), etag, last_modified)
+
+        except Product.DoesNotExist:
+            return json_response(
+                {"error": "Product not found!"}, status.HTTP_404_NOT_FOUND
+            )
+
+
+class FilterProducts(View):
+    async def get(self, request, item_type, category, gender, sort_by):
+        output_format = stream_format(request)
+        if output_format:
+            rows = filtered_rows(item_type, category, gender, sort_by)
+            return astreaming_response(rows, output_format)
+
+        try:
+            products_page = await afilter_page(
+                item_type,
+                category,
+                gender,
+                sort_by,
+                request.GET.get("cursor"),
+                newest_first.get_page_size(request),
+            )
+        except InvalidCursor as e:
+            return json_response({"error": str(e)}, status.HTTP_400_BAD_REQUEST)
+
+        return json_response(products_page)
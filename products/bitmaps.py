@@ -0,0 +1,376 @@
+import sys
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone as dt_timezone
+from threading import Lock, RLock
+from uuid import UUID
+
+import numpy as np
+from django.conf import settings
+
+from .models import Product, parse_genders, parse_regions
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+LOW_BITS = (1 << 64) - 1
+
+# Columns loaded per product, the attributes are derived from them
+ROW_FIELDS = (
+    "id",
+    "brick__name",
+    "category__name",
+    "gender",
+    "style_region",
+    "is_active",
+    "created",
+    "mrp",
+)
+
+# What build() swaps in, everything the filters and pages are read from
+STATE_FIELDS = (
+    "size",
+    "ordinals",
+    "free",
+    "alive",
+    "bitsets",
+    "created",
+    "mrp",
+    "mrp_null",
+    "id_high",
+    "id_low",
+    "_orders",
+)
+
+
+def to_microseconds(value):
+    return (value - EPOCH) // MICROSECOND
+
+
+def row_attributes(row):
+    _, brick, category, gender, style_region, is_active = row[:6]
+    attributes = [("is_active", is_active)]
+    if brick is not None:
+        attributes.append(("brick", brick))
+    if category is not None:
+        attributes.append(("category", category))
+    attributes += [("gender", name) for name in parse_genders(gender)]
+    attributes += [("region", name) for name in parse_regions(style_region)]
+    return attributes
+
+
+class BitmapIndex:
+    """
+    In-process filter engine over a dense product ordinal. Each attribute
+    value (brick, category, gender, region, is_active) has one bitset of
+    uint64 words, so a filter is a few bitwise ORs and ANDs. Sort keys live
+    in parallel arrays, and pages come out in the same keyset order, with
+    the same cursors, as KeysetPaginator's SQL.
+
+    Built lazily, kept current by the Product signals of this process and
+    rebuilt after CATALOG_BITMAP_MAX_AGE seconds to pick up changes made
+    by other processes. Until then another process' saves don't show up
+    here: filtered pages can miss or still show those products for up to
+    max_age seconds.
+    """
+
+    def __init__(self, max_age=300):
+        self.max_age = max_age
+        self._lock = RLock()
+        # One rebuild at a time, without blocking readers of the old arrays
+        self._build_lock = Lock()
+        self._generation = 0
+        # Products saved or deleted while a build runs, replayed after it
+        self._changed = None
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self.built_at = None
+            self.size = 0
+            self.ordinals = {}
+            self.free = []
+            self.alive = np.zeros(0, dtype=np.uint64)
+            self.bitsets = {}
+            self.created = np.zeros(0, dtype=np.int64)
+            self.mrp = np.zeros(0, dtype=np.float64)
+            self.mrp_null = np.zeros(0, dtype=np.uint8)
+            self.id_high = np.zeros(0, dtype=np.uint64)
+            self.id_low = np.zeros(0, dtype=np.uint64)
+            self._orders = {}
+
+    @property
+    def is_built(self):
+        return self.built_at is not None
+
+    @property
+    def is_stale(self):
+        built_at = self.built_at
+        return built_at is None or time.monotonic() - built_at > self.max_age
+
+    def ensure_built(self):
+        if not self.is_stale:
+            return
+        # While another thread rebuilds, a built index keeps serving
+        if self._build_lock.acquire(blocking=not self.is_built):
+            try:
+                if self.is_stale:
+                    self.build()
+            finally:
+                self._build_lock.release()
+
+    def build(self):
+        """
+        Load every product into new arrays and swap them in. The lock is
+        only held for the swap, pages keep reading the old arrays meanwhile.
+        """
+        with self._lock:
+            generation = self._generation
+            self._changed = set()
+        try:
+            fresh = BitmapIndex(self.max_age)
+            rows = Product.objects.order_by().values_list(*ROW_FIELDS)
+            for row in rows.iterator(chunk_size=5000):
+                fresh._store(row)
+        except BaseException:
+            with self._lock:
+                self._changed = None
+            raise
+
+        with self._lock:
+            changed, self._changed = self._changed, None
+            if self._generation != generation:
+                # Cleared meanwhile, the rows read may predate a rename
+                return
+            for name in STATE_FIELDS:
+                setattr(self, name, getattr(fresh, name))
+            self.built_at = time.monotonic()
+            for pk in changed:
+                self._refresh(pk)
+
+    def _grow(self, ordinal):
+        if ordinal < len(self.created):
+            return
+        capacity = max(1024, len(self.created) * 2)
+        words = capacity // 64
+        extra_words = words - len(self.alive)
+        extra = capacity - len(self.created)
+
+        self.alive = np.concatenate([self.alive, np.zeros(extra_words, np.uint64)])
+        for key, bitset in self.bitsets.items():
+            self.bitsets[key] = np.concatenate(
+                [bitset, np.zeros(extra_words, np.uint64)]
+            )
+        for name in ("created", "mrp", "mrp_null", "id_high", "id_low"):
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate([array, np.zeros(extra, array.dtype)]))
+
+    def _set_bit(self, bitset, ordinal):
+        bitset[ordinal >> 6] |= np.uint64(1 << (ordinal & 63))
+
+    def _clear_bit(self, bitset, ordinal):
+        bitset[ordinal >> 6] &= ~np.uint64(1 << (ordinal & 63))
+
+    def _store(self, row):
+        pk = row[0]
+        ordinal = self.ordinals.get(pk.int)
+        if ordinal is None:
+            ordinal = self.free.pop() if self.free else self.size
+            self.size = max(self.size, ordinal + 1)
+            self._grow(ordinal)
+            self.ordinals[pk.int] = ordinal
+        else:
+            self._clear_ordinal(ordinal)
+
+        self._set_bit(self.alive, ordinal)
+        for key in row_attributes(row):
+            bitset = self.bitsets.get(key)
+            if bitset is None:
+                bitset = self.bitsets[key] = np.zeros(len(self.alive), np.uint64)
+            self._set_bit(bitset, ordinal)
+
+        created, mrp = row[6], row[7]
+        self.created[ordinal] = to_microseconds(created)
+        self.mrp_null[ordinal] = mrp is None
+        self.mrp[ordinal] = 0.0 if mrp is None else float(mrp)
+        self.id_high[ordinal] = pk.int >> 64
+        self.id_low[ordinal] = pk.int & LOW_BITS
+        self._orders = {}
+
+    def _clear_ordinal(self, ordinal):
+        self._clear_bit(self.alive, ordinal)
+        for bitset in self.bitsets.values():
+            self._clear_bit(bitset, ordinal)
+        self._orders = {}
+
+    def update(self, pk):
+        """Re-read one product after a save, if the index is built."""
+        with self._lock:
+            if self._changed is not None:
+                self._changed.add(pk)
+            if self.is_built:
+                self._refresh(pk)
+
+    def _refresh(self, pk):
+        row = Product.objects.filter(pk=pk).values_list(*ROW_FIELDS).first()
+        if row is None:
+            self._remove(pk)
+        else:
+            self._store(row)
+
+    def remove(self, pk):
+        with self._lock:
+            if self._changed is not None:
+                self._changed.add(pk)
+            self._remove(pk)
+
+    def _remove(self, pk):
+        ordinal = self.ordinals.pop(pk.int, None)
+        if ordinal is not None:
+            self._clear_ordinal(ordinal)
+            self.free.append(ordinal)
+
+    def match(self, filters):
+        """
+        Bitset of the products matching filters, {attribute: [values]}.
+        Values of one attribute are ORed, attributes are ANDed.
+        """
+        result = self.alive.copy()
+        for attribute, values in filters.items():
+            union = np.zeros_like(result)
+            for value in values:
+                bitset = self.bitsets.get((attribute, value))
+                if bitset is not None:
+                    union |= bitset
+            result &= union
+        return result
+
+    def to_mask(self, bitset):
+        bits = np.unpackbits(bitset.view(np.uint8), bitorder="little")
+        return bits[: self.size].astype(bool)
+
+    def sort_keys(self, ordering, created, mrp_null, mrp, high, low):
+        """
+        Keys, most significant first, whose ascending order is ordering.
+        Works on arrays and on scalars alike: ~ reverses the order of
+        Python ints just as it does for uint64.
+        """
+        if ordering == "-created":
+            return (-created, ~high, ~low)
+        if ordering == "mrp":
+            return (mrp_null, mrp, high, low)
+        if ordering == "-mrp":
+            return (mrp_null, -mrp, ~high, ~low)
+        raise ValueError(f"Unsupported ordering {ordering}")
+
+    def ordinal_key(self, ordering, ordinal):
+        high, low = int(self.id_high[ordinal]), int(self.id_low[ordinal])
+        return self.sort_keys(
+            ordering,
+            int(self.created[ordinal]),
+            int(self.mrp_null[ordinal]),
+            float(self.mrp[ordinal]),
+            high,
+            low,
+        )
+
+    def order(self, ordering):
+        """Live ordinals sorted by ordering, cached until the next change."""
+        if ordering not in self._orders:
+            live = np.flatnonzero(self.to_mask(self.alive))
+            keys = self.sort_keys(
+                ordering,
+                self.created[live],
+                self.mrp_null[live],
+                self.mrp[live],
+                self.id_high[live],
+                self.id_low[live],
+            )
+            self._orders[ordering] = live[np.lexsort(keys[::-1])]
+        return self._orders[ordering]
+
+    def cursor_key(self, paginator, cursor):
+        value, pk = paginator.position(cursor)
+        created = mrp = 0
+        mrp_null = 0
+        if paginator.field_name == "created":
+            created = to_microseconds(value)
+        elif value is None:
+            mrp_null = 1
+        else:
+            mrp = float(value)
+        return self.sort_keys(
+            self.ordering(paginator),
+            created,
+            mrp_null,
+            mrp,
+            pk.int >> 64,
+            pk.int & LOW_BITS,
+        )
+
+    def ordering(self, paginator):
+        return ("-" if paginator.descending else "") + paginator.field_name
+
+    def page_ids(self, paginator, filters, cursor, limit):
+        while True:
+            self.ensure_built()
+            with self._lock:
+                # Unless cleared since, e.g. by a rename
+                if self.is_built:
+                    return self._page_ids(paginator, filters, cursor, limit)
+
+    def _page_ids(self, paginator, filters, cursor, limit):
+        ordering = self.ordering(paginator)
+        order = self.order(ordering)
+        mask = self.to_mask(self.match(filters))
+
+        start = 0
+        if cursor:
+            start = bisect_right(
+                range(len(order)),
+                self.cursor_key(paginator, cursor),
+                key=lambda position: self.ordinal_key(ordering, order[position]),
+            )
+        window = order[start:]
+        hits = window[mask[window]][:limit]
+        return [
+            UUID(int=(int(self.id_high[ordinal]) << 64) | int(self.id_low[ordinal]))
+            for ordinal in hits
+        ]
+
+    def page(self, paginator, filters, cursor, page_size, rows):
+        """
+        Same result as paginator.page() over the filtered SQL queryset.
+        rows is the values() queryset the page's rows are read from.
+        """
+        product_ids = self.page_ids(paginator, filters, cursor, page_size + 1)
+        rows_by_id = {row["id"]: row for row in rows.filter(pk__in=product_ids)}
+        page_rows = [rows_by_id[pk] for pk in product_ids if pk in rows_by_id]
+        return paginator.make_page(page_rows, page_size)
+
+    def stats(self):
+        with self._lock:
+            arrays = [
+                self.alive,
+                self.created,
+                self.mrp,
+                self.mrp_null,
+                self.id_high,
+                self.id_low,
+                *self.bitsets.values(),
+                *self._orders.values(),
+            ]
+            array_bytes = sum(array.nbytes for array in arrays)
+            # Rough: dict table plus an int key per product
+            ordinal_bytes = sys.getsizeof(self.ordinals) + 36 * len(self.ordinals)
+            return {
+                "built": self.is_built,
+                "products": len(self.ordinals),
+                "bitsets": len(self.bitsets),
+                "array_bytes": array_bytes,
+                "memory_bytes": array_bytes + ordinal_bytes,
+            }
+
+
+product_bitmaps = BitmapIndex(getattr(settings, "CATALOG_BITMAP_MAX_AGE", 300))
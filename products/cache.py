@@ -0,0 +1,250 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CatalogVersion
+
+
+CATALOG_VERSION_KEY = "catalog:version"
+CATALOG_MODIFIED_KEY = "catalog:modified"
+
+
+class DatabaseVersion:
+    """The catalog version and its modification time, in the CatalogVersion row."""
+
+    pk = 1
+
+    def rows(self):
+        return CatalogVersion.objects.filter(pk=self.pk).values_list(
+            "version", "modified"
+        )
+
+    def get(self):
+        row = self.rows().first()
+        if row is None:
+            row = self.create()
+        return row[0], row[1].timestamp()
+
+    async def aget(self):
+        row = await self.rows().afirst()
+        if row is None:
+            state, _ = await CatalogVersion.objects.aget_or_create(pk=self.pk)
+            row = state.version, state.modified
+        return row[0], row[1].timestamp()
+
+    def create(self):
+        state, _ = CatalogVersion.objects.get_or_create(pk=self.pk)
+        return state.version, state.modified
+
+    def bump(self):
+        bump = {"version": F("version") + 1, "modified": timezone.now()}
+        if not CatalogVersion.objects.filter(pk=self.pk).update(**bump):
+            self.create()
+            CatalogVersion.objects.filter(pk=self.pk).update(**bump)
+        return self.get()[0]
+
+
+class LRUBackend:
+    """
+    In-process LRU, one per worker. The catalog version is shared through
+    the database, so every worker sees a bump made by any process.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = DatabaseVersion()
+        self._version = None
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _seen(self, state):
+        with self._lock:
+            if state[0] != self._version:
+                # Old entries can never be hit again, drop them right away
+                self._entries.clear()
+                self._version = state[0]
+        return state
+
+    def get_state(self):
+        return self._seen(self._versions.get())
+
+    def get_version(self):
+        return self.get_state()[0]
+
+    def bump_version(self):
+        return self._versions.bump()
+
+    def get_modified(self):
+        return self.get_state()[1]
+
+    def size(self):
+        return len(self._entries)
+
+    async def aget(self, key):
+        return self.get(key)
+
+    async def aset(self, key, value):
+        self.set(key, value)
+
+    async def aget_state(self):
+        return self._seen(await self._versions.aget())
+
+    async def aget_version(self):
+        return (await self.aget_state())[0]
+
+    async def aget_modified(self):
+        return (await self.aget_state())[1]
+
+
+class DjangoCacheBackend:
+    """Shares entries and the catalog version across workers via CACHES."""
+
+    def __init__(self, alias="default", timeout=None):
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.timeout)
+
+    def get_version(self):
+        return self.cache.get_or_set(CATALOG_VERSION_KEY, 0, None)
+
+    def bump_version(self):
+        try:
+            version = self.cache.incr(CATALOG_VERSION_KEY)
+        except ValueError:
+            # Key evicted or never set
+            self.cache.set(CATALOG_VERSION_KEY, 1, None)
+            version = 1
+        self.cache.set(CATALOG_MODIFIED_KEY, time.time(), None)
+        return version
+
+    def get_modified(self):
+        # An evicted timestamp restarts at now, which only costs a refetch
+        return self.cache.get_or_set(CATALOG_MODIFIED_KEY, time.time, None)
+
+    def get_state(self):
+        return self.get_version(), self.get_modified()
+
+    def size(self):
+        return None
+
+    async def aget(self, key):
+        return await self.cache.aget(key)
+
+    async def aset(self, key, value):
+        await self.cache.aset(key, value, self.timeout)
+
+    async def aget_version(self):
+        return await self.cache.aget_or_set(CATALOG_VERSION_KEY, 0, None)
+
+    async def aget_modified(self):
+        return await self.cache.aget_or_set(CATALOG_MODIFIED_KEY, time.time, None)
+
+    async def aget_state(self):
+        return await self.aget_version(), await self.aget_modified()
+
+
+BACKENDS = {
+    "lru": LRUBackend,
+    "django": DjangoCacheBackend,
+}
+
+
+class CatalogCache:
+    """
+    Read-through cache for catalog payloads. Keys are prefixed with the
+    global catalog version, so bumping the version invalidates everything.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, version, *parts):
+        return "catalog:%s:%s" % (version, ":".join(str(part) for part in parts))
+
+    def get_or_set(self, parts, builder):
+        key = self.make_key(self.backend.get_version(), *parts)
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = builder()
+        self.backend.set(key, value)
+        return value
+
+    async def aget_or_set(self, parts, builder):
+        """Async variant of get_or_set, builder is a coroutine function."""
+        key = self.make_key(await self.backend.aget_version(), *parts)
+        value = await self.backend.aget(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = await builder()
+        await self.backend.aset(key, value)
+        return value
+
+    def bump_version(self):
+        return self.backend.bump_version()
+
+    def state(self):
+        """(version, modified timestamp), what conditional GETs validate against."""
+        return self.backend.get_state()
+
+    async def astate(self):
+        return await self.backend.aget_state()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        version, modified = self.backend.get_state()
+        return {
+            "backend": type(self.backend).__name__,
+            "version": version,
+            "modified": modified,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "size": self.backend.size(),
+        }
+
+
+def build_catalog_cache():
+    options = dict(getattr(settings, "CATALOG_CACHE", {}))
+    backend_name = options.pop("BACKEND", "lru")
+    backend_options = {key.lower(): value for key, value in options.items()}
+    return CatalogCache(BACKENDS[backend_name](**backend_options))
+
+
+catalog_cache = build_catalog_cache()
@@ -0,0 +1,166 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+
+from .bitmaps import product_bitmaps
+from .cache import catalog_cache
+from .models import Product, parse_genders
+from .pagination import KeysetPaginator
+
+
+RELATED_NAME_FIELDS = [
+    "brand__name",
+    "brick__name",
+    "category__name",
+    "collection__name",
+    "uploaded_by__username",
+]
+
+
+def catalog_fields():
+    return list(Product.PUBLIC_FIELDS) + RELATED_NAME_FIELDS
+
+
+CATALOG_FIELDS = catalog_fields()
+
+ITEM_FIELDS = list(Product.PUBLIC_FIELDS)
+
+RELATED_FIELDS = ("brand", "category", "brick", "collection", "uploaded_by")
+
+
+def catalog_queryset(regions):
+    if not regions:
+        return Product.objects.all().values(*CATALOG_FIELDS)
+
+    # One indexed lookup through the region index, each product once
+    product_ids = Product.regions.through.objects.filter(
+        region__name__in=regions
+    ).values("product_id")
+    return Product.objects.filter(pk__in=product_ids).values(*CATALOG_FIELDS)
+
+
+newest_first = KeysetPaginator("-created")
+
+
+def catalog_page(regions, cursor, page_size):
+    if settings.CATALOG_BITMAP_FILTERS:
+        filters = {"region": regions} if regions else {}
+        rows = Product.objects.values(*CATALOG_FIELDS)
+        return product_bitmaps.page(newest_first, filters, cursor, page_size, rows)
+    return newest_first.page(catalog_queryset(regions), cursor, page_size)
+
+
+async def acatalog_page(regions, cursor, page_size):
+    if settings.CATALOG_BITMAP_FILTERS:
+        return await sync_to_async(catalog_page)(regions, cursor, page_size)
+    return await newest_first.apage(catalog_queryset(regions), cursor, page_size)
+
+
+def fetch_catalog(regions, cursor=None, page_size=None):
+    page_size = page_size or newest_first.page_size
+    return catalog_cache.get_or_set(
+        ("products", ",".join(regions), cursor or "", page_size),
+        lambda: catalog_page(regions, cursor, page_size),
+    )
+
+
+async def afetch_catalog(regions, cursor=None, page_size=None):
+    page_size = page_size or newest_first.page_size
+    return await catalog_cache.aget_or_set(
+        ("products", ",".join(regions), cursor or "", page_size),
+        lambda: acatalog_page(regions, cursor, page_size),
+    )
+
+
+def item_data(product):
+    """FetchItem payload, product should come with RELATED_FIELDS selected."""
+    data = {}
+    for field in ITEM_FIELDS:
+        value = getattr(product, field)
+        if field == "uploaded_by":
+            data[field] = value.username if value else None
+        elif hasattr(value, "name"):
+            data[field] = value.name
+        else:
+            data[field] = value
+    return data
+
+
+def split_filter(value):
+    return [val.strip() for val in value.split(",")]
+
+
+def product_filters(item_type, category, gender):
+    """FilterProducts filters as {facet: Q}, "Any" values are left out."""
+    filters = {}
+    if item_type != "Any":
+        filters["brick"] = Q(brick__name__in=split_filter(item_type))
+    if category != "Any":
+        filters["category"] = Q(category__name__in=split_filter(category))
+    if gender != "Any":
+        # Through the gender index rather than a per-row regex
+        product_ids = Product.genders.through.objects.filter(
+            gender__name__in=parse_genders(gender)
+        ).values("product_id")
+        filters["gender"] = Q(pk__in=product_ids)
+    return filters
+
+
+def filter_products(item_type, category, gender):
+    filters = product_filters(item_type, category, gender)
+    return Product.objects.filter(*filters.values()).values(*ITEM_FIELDS)
+
+
+SORT_PAGINATORS = {
+    "mrp_low_to_high": KeysetPaginator("mrp"),
+    "mrp_high_to_low": KeysetPaginator("-mrp"),
+}
+
+
+def sort_paginator(sort_by):
+    """Paginator ordering the FilterProducts results for sort_by."""
+    if sort_by == "Any" or sort_by == "newest":
+        return newest_first
+    # Unknown values sort by price, low to high, as before
+    return SORT_PAGINATORS.get(sort_by, SORT_PAGINATORS["mrp_low_to_high"])
+
+
+def bitmap_filters(item_type, category, gender):
+    """product_filters() as {attribute: [values]} for the bitmap engine."""
+    filters = {}
+    if item_type != "Any":
+        filters["brick"] = split_filter(item_type)
+    if category != "Any":
+        filters["category"] = split_filter(category)
+    if gender != "Any":
+        filters["gender"] = parse_genders(gender)
+    return filters
+
+
+def filter_page(item_type, category, gender, sort_by, cursor, page_size):
+    paginator = sort_paginator(sort_by)
+    if settings.CATALOG_BITMAP_FILTERS:
+        filters = bitmap_filters(item_type, category, gender)
+        rows = Product.objects.values(*ITEM_FIELDS)
+        return product_bitmaps.page(paginator, filters, cursor, page_size, rows)
+    products = filter_products(item_type, category, gender)
+    return paginator.page(products, cursor, page_size)
+
+
+async def afilter_page(item_type, category, gender, sort_by, cursor, page_size):
+    if settings.CATALOG_BITMAP_FILTERS:
+        return await sync_to_async(filter_page)(
+            item_type, category, gender, sort_by, cursor, page_size
+        )
+    products = filter_products(item_type, category, gender)
+    return await sort_paginator(sort_by).apage(products, cursor, page_size)
+
+
+# Every matching row in listing order, for the streaming responses
+def catalog_rows(regions):
+    return catalog_queryset(regions).order_by(*newest_first.order_by())
+
+
+def filtered_rows(item_type, category, gender, sort_by):
+    products = filter_products(item_type, category, gender)
+    return products.order_by(*sort_paginator(sort_by).order_by())
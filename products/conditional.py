@@ -0,0 +1,75 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .cache import catalog_cache
+from .models import Product
+
+
+def make_etag(*parts):
+    key = ":".join(str(part) for part in parts)
+    return quote_etag(hashlib.blake2b(key.encode(), digest_size=16).hexdigest())
+
+
+def catalog_validators(request, *parts):
+    """
+    ETag and Last-Modified timestamp of a catalog listing. Both come from the
+    catalog version, which every process shares, so any worker answers with
+    the same validators and none of them misses a change.
+    """
+    version, modified = catalog_cache.state()
+    return make_etag(version, modified, request.get_full_path(), *parts), modified
+
+
+async def acatalog_validators(request, *parts):
+    version, modified = await catalog_cache.astate()
+    return make_etag(version, modified, request.get_full_path(), *parts), modified
+
+
+def updated_at_row(id):
+    return Product.objects.filter(pk=id).values_list("updated_at", flat=True)
+
+
+def item_validators(id):
+    """
+    ETag and Last-Modified timestamp of a FetchItem response, from the
+    product's updated_at as stored. None if there's no such product.
+    """
+    return validators_for(id, updated_at_row(id).first())
+
+
+async def aitem_validators(id):
+    return validators_for(id, await updated_at_row(id).afirst())
+
+
+def validators_for(id, updated_at):
+    if updated_at is None:
+        return None, None
+    return make_etag(id, updated_at.isoformat()), updated_at.timestamp()
+
+
+def set_validators(response, etag, last_modified, private=False):
+    if etag is not None:
+        response.headers["ETag"] = etag
+        response.headers["Last-Modified"] = http_date(last_modified)
+        # Clients may keep it, but have to revalidate before every use
+        if private:
+            patch_cache_control(response, private=True)
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+def not_modified(request, etag, last_modified, private=False):
+    """
+    The 304 (or 412) answering the request's If-None-Match/If-Modified-Since
+    headers, None if the full response has to be sent.
+    """
+    if etag is None:
+        return None
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified)
+    )
+    if response is None:
+        return None
+    return set_validators(response, etag, last_modified, private)
@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.db.models import Count, Q
+
+from .cache import catalog_cache
+from .catalog import product_filters
+from .models import Product
+
+
+def price_buckets(bounds):
+    """[0, 500, 1000] -> [("0-500", 0, 500), ("500-1000", ...), ("1000+", 1000, None)]"""
+    buckets = []
+    for index, lower in enumerate(bounds):
+        upper = bounds[index + 1] if index + 1 < len(bounds) else None
+        label = f"{lower}-{upper}" if upper is not None else f"{lower}+"
+        buckets.append((label, lower, upper))
+    return buckets
+
+
+def other_filters(filters, facet):
+    # Disjunctive facets: a facet's own selection doesn't narrow its counts
+    return [q for name, q in filters.items() if name != facet]
+
+
+def name_counts(filters, facet):
+    rows = (
+        Product.objects.filter(*other_filters(filters, facet))
+        .filter(**{f"{facet}__isnull": False})
+        .values_list(f"{facet}__name")
+        .annotate(count=Count("id"))
+        .order_by("-count", f"{facet}__name")
+    )
+    return dict(rows)
+
+
+def gender_counts(filters):
+    product_ids = Product.objects.filter(*other_filters(filters, "gender")).values("pk")
+    rows = (
+        Product.genders.through.objects.filter(product_id__in=product_ids)
+        .values_list("gender__name")
+        .annotate(count=Count("product_id"))
+        .order_by("-count", "gender__name")
+    )
+    return dict(rows)
+
+
+def price_counts(filters):
+    counts = {}
+    for label, lower, upper in price_buckets(settings.CATALOG_PRICE_BUCKETS):
+        bucket = Q(mrp__gte=lower)
+        if upper is not None:
+            bucket &= Q(mrp__lt=upper)
+        counts[label] = Count("id", filter=bucket)
+    # Price isn't a filter, so every bucket comes from one aggregate
+    return Product.objects.filter(*filters.values()).aggregate(**counts)
+
+
+def compute_facets(item_type, category, gender):
+    filters = product_filters(item_type, category, gender)
+    return {
+        "brick": name_counts(filters, "brick"),
+        "category": name_counts(filters, "category"),
+        "gender": gender_counts(filters),
+        "price": price_counts(filters),
+    }
+
+
+def fetch_facets(item_type, category, gender):
+    return catalog_cache.get_or_set(
+        ("facets", item_type, category, gender),
+        lambda: compute_facets(item_type, category, gender),
+    )
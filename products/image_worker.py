@@ -0,0 +1,167 @@
+import hashlib
+import posixpath
+from concurrent.futures import as_completed
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from .cache import catalog_cache
+from .images import FORMAT_EXTENSIONS, process_product_images
+from .models import Product
+
+
+def requeue_stale(stale_after):
+    """Release rows claimed by a worker that died mid-job."""
+    cutoff = timezone.now() - stale_after
+    return Product.objects.filter(
+        image_status=Product.IMAGE_PROCESSING, image_claimed_at__lt=cutoff
+    ).update(image_status=Product.IMAGE_PENDING, image_claimed_at=None)
+
+
+def claim_batch(batch_size):
+    pending = Product.objects.filter(image_status=Product.IMAGE_PENDING).order_by(
+        "created"
+    )
+    claimed = []
+    for pk in pending.values_list("pk", flat=True)[:batch_size]:
+        # Conditional update, so concurrent drainers never claim the same row
+        if Product.objects.filter(pk=pk, image_status=Product.IMAGE_PENDING).update(
+            image_status=Product.IMAGE_PROCESSING, image_claimed_at=timezone.now()
+        ):
+            claimed.append(pk)
+    return claimed
+
+
+def read_images(product, fields=Product.IMAGE_FIELDS):
+    images = {}
+    for field in fields:
+        image = getattr(product, field)
+        if image:
+            with image.open("rb") as image_file:
+                images[field] = image_file.read()
+    return images
+
+
+def rendition_name(field, name, image_format, data):
+    # Content-hashed, so a stored rendition never changes and caches forever
+    digest = hashlib.sha256(data).hexdigest()[:20]
+    extension = FORMAT_EXTENSIONS[image_format]
+    return f"renditions/{digest}-{field}-{name}.{extension}"
+
+
+def store_renditions(rendered):
+    rendition_map = {}
+    for field, renditions in rendered.items():
+        rendition_map[field] = {}
+        for name, rendition in renditions.items():
+            entry = {"width": rendition["width"]}
+            for image_format, data in rendition["files"].items():
+                path = rendition_name(field, name, image_format, data)
+                if not default_storage.exists(path):
+                    default_storage.save(path, ContentFile(data))
+                entry[image_format] = path
+            rendition_map[field][name] = entry
+    return rendition_map
+
+
+def image_job(product, images):
+    output_digests = {
+        field: record["output"] for field, record in product.image_hashes.items()
+    }
+    return (
+        process_product_images,
+        images,
+        "image_1",
+        settings.PRODUCT_IMAGE_RENDITIONS,
+        settings.PRODUCT_IMAGE_FORMATS,
+        output_digests,
+    )
+
+
+def compressed_name(name, data):
+    # A name of its own, so the stored upload is never overwritten before
+    # the claim has been checked
+    stem = posixpath.splitext(posixpath.basename(name))[0]
+    return f"{stem}-{hashlib.sha256(data).hexdigest()[:12]}.jpg"
+
+
+def store_result(product, result):
+    compressed, rendered, digests = result
+    stored_name = None
+    if compressed is not None:
+        product.image_1.save(
+            compressed_name(product.image_1.name, compressed),
+            ContentFile(compressed),
+            save=False,
+        )
+        stored_name = product.image_1.name
+
+    image_renditions = {**product.image_renditions, **store_renditions(rendered)}
+    image_hashes = dict(product.image_hashes)
+    for field, digest in digests.items():
+        image_hashes[field] = {"name": getattr(product, field).name, **digest}
+
+    # Skip rows re-queued by an edit while this job was running
+    updated = Product.objects.filter(
+        pk=product.pk, image_status=Product.IMAGE_PROCESSING
+    ).update(
+        image_1=product.image_1.name,
+        image_renditions=image_renditions,
+        image_hashes=image_hashes,
+        image_status=Product.IMAGE_DONE,
+        image_error="",
+        image_claimed_at=None,
+        updated_at=timezone.now(),
+    )
+    if not updated and stored_name:
+        default_storage.delete(stored_name)
+    return updated
+
+
+def record_failure(pk, error, max_attempts):
+    Product.objects.filter(pk=pk, image_status=Product.IMAGE_PROCESSING).update(
+        image_attempts=F("image_attempts") + 1,
+        image_status=Case(
+            When(
+                image_attempts__gte=max_attempts - 1,
+                then=Value(Product.IMAGE_FAILED),
+            ),
+            default=Value(Product.IMAGE_PENDING),
+        ),
+        image_error=str(error),
+        image_claimed_at=None,
+    )
+
+
+def process_batch(executor, batch_size, max_attempts):
+    """
+    Claim a batch of pending products, compress image_1 and render every
+    image on the executor, then write the results back. Returns the number
+    claimed.
+    """
+    claimed = claim_batch(batch_size)
+    products = Product.objects.in_bulk(claimed)
+
+    futures = {}
+    for product in products.values():
+        try:
+            images = read_images(product, product.stale_image_fields())
+        except Exception as error:
+            record_failure(product.pk, error, max_attempts)
+            continue
+        futures[executor.submit(*image_job(product, images))] = product
+
+    stored = 0
+    for future in as_completed(futures):
+        product = futures[future]
+        try:
+            stored += store_result(product, future.result())
+        except Exception as error:
+            record_failure(product.pk, error, max_attempts)
+
+    if stored:
+        catalog_cache.bump_version()
+    return len(claimed)
@@ -0,0 +1,122 @@
+import hashlib
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+
+# Bounding box (width, height), same bounds as the old 1920x1280 resize
+MAX_IMAGE_SIZE = (1280, 1920)
+JPEG_QUALITY = 85
+
+EXIF_ORIENTATION = 0x0112
+# Orientations that swap width and height once applied
+ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+
+
+def file_digest(image_file):
+    digest = hashlib.sha256()
+    image_file.seek(0)
+    for chunk in image_file.chunks():
+        digest.update(chunk)
+    image_file.seek(0)
+    return digest.hexdigest()
+
+
+def resize_image(data, max_size=MAX_IMAGE_SIZE):
+    """
+    Shrink an image to fit inside max_size, keeping its aspect ratio and
+    EXIF orientation. Works on the decoded uint8 pixels only: JPEGs are
+    downscaled while decoding via draft(), and thumbnail() reduces in
+    integer steps before the final resample. Never upscales.
+    """
+    image = Image.open(BytesIO(data))
+
+    # draft() works on the stored pixels, before orientation is applied
+    draft_size = max_size
+    if image.getexif().get(EXIF_ORIENTATION) in ROTATED_ORIENTATIONS:
+        draft_size = (max_size[1], max_size[0])
+    image.draft("RGB", draft_size)
+
+    image = ImageOps.exif_transpose(image)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    image.thumbnail(max_size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+    return image
+
+
+def compress_image(data, output_digest=None):
+    """
+    Resize raw image bytes to fit the product image bounds, as JPEG.
+    Returns None if data hashes to output_digest, the recorded output of
+    the last run, so it isn't re-encoded and doesn't lose quality again.
+    """
+    if output_digest and hashlib.sha256(data).hexdigest() == output_digest:
+        return None
+
+    image = resize_image(data)
+    image_buffer = BytesIO()
+    image.save(image_buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    return image_buffer.getvalue()
+
+
+FORMAT_EXTENSIONS = {"jpeg": "jpg", "webp": "webp"}
+
+
+def fit_width(image, width):
+    if image.width <= width:
+        return image
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+
+def render_renditions(data, renditions, formats):
+    """
+    Encode one source image at every configured width and format.
+    renditions maps a name to a width, e.g. {"thumbnail": 320}. Returns
+    {name: {"width": actual_width, "files": {format: bytes}}}.
+    """
+    widest = max(renditions.values())
+    image = resize_image(data, (widest, widest * 4))
+
+    rendered = {}
+    # Widest first, so each step resamples the previous, smaller image
+    for name, width in sorted(renditions.items(), key=lambda item: -item[1]):
+        image = fit_width(image, width)
+        files = {}
+        for image_format in formats:
+            image_buffer = BytesIO()
+            image.save(image_buffer, format=image_format.upper(), quality=JPEG_QUALITY)
+            files[image_format] = image_buffer.getvalue()
+        rendered[name] = {"width": image.width, "files": files}
+    return rendered
+
+
+def process_product_images(
+    images, compress_field, renditions, formats, output_digests=None
+):
+    """
+    Worker job for one product. images maps field names to raw bytes,
+    output_digests maps them to the output hashes recorded last time.
+    Returns the compressed bytes for compress_field (or None), the
+    renditions of every image and the source/output digests of each.
+    """
+    compressed = None
+    if compress_field in images:
+        compressed = compress_image(
+            images[compress_field], (output_digests or {}).get(compress_field)
+        )
+
+    digests = {}
+    for field, data in images.items():
+        output = compressed if field == compress_field and compressed else data
+        digests[field] = {
+            "source": hashlib.sha256(data).hexdigest(),
+            "output": hashlib.sha256(output).hexdigest(),
+        }
+
+    rendered = {
+        field: render_renditions(data, renditions, formats)
+        for field, data in images.items()
+    }
+    return compressed, rendered, digests
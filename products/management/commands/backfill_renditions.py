@@ -0,0 +1,74 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from products.cache import catalog_cache
+from products.image_worker import read_images, store_renditions
+from products.images import process_product_images
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = "Render image renditions and record image hashes for existing products."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Re-render products that already have renditions.",
+        )
+
+    def handle(self, *args, **options):
+        has_image = Q()
+        for field in Product.IMAGE_FIELDS:
+            has_image |= Q(**{f"{field}__isnull": False}) & ~Q(**{field: ""})
+
+        products = Product.objects.filter(has_image)
+        if not options["all"]:
+            products = products.filter(image_renditions={})
+        pks = list(products.values_list("pk", flat=True))
+
+        batch_size = options["batch_size"]
+        done = 0
+        with ProcessPoolExecutor(max_workers=options["workers"]) as executor:
+            for start in range(0, len(pks), batch_size):
+                batch = Product.objects.in_bulk(pks[start : start + batch_size])
+                futures = {
+                    executor.submit(
+                        process_product_images,
+                        read_images(product),
+                        None,
+                        settings.PRODUCT_IMAGE_RENDITIONS,
+                        settings.PRODUCT_IMAGE_FORMATS,
+                    ): product
+                    for product in batch.values()
+                }
+                for future in as_completed(futures):
+                    product = futures[future]
+                    try:
+                        _, rendered, digests = future.result()
+                    except Exception as error:
+                        self.stderr.write(f"{product.pk}: {error}")
+                        continue
+                    image_hashes = dict(product.image_hashes)
+                    for field, digest in digests.items():
+                        image_hashes[field] = {
+                            "name": getattr(product, field).name,
+                            **digest,
+                        }
+                    Product.objects.filter(pk=product.pk).update(
+                        image_renditions=store_renditions(rendered),
+                        image_hashes=image_hashes,
+                        updated_at=timezone.now(),
+                    )
+                    done += 1
+                self.stdout.write(f"Rendered {done}/{len(pks)} products")
+
+        if done:
+            catalog_cache.bump_version()
@@ -0,0 +1,156 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from products.bitmaps import product_bitmaps
+from products.catalog import catalog_page, catalog_rows, filter_page, filtered_rows
+from products.models import Brick, Category, Gender, Product, Region
+from shopipy_server.benchmarks import throwaway_database
+
+
+GENDERS = ["Men", "Women", "Kids"]
+REGIONS = ["western", "south_indian", "north_indian", "east_indian", "fusion"]
+
+
+def random_filters(rng, bricks, categories):
+    def pick(names):
+        if rng.random() < 0.3:
+            return "Any"
+        return ",".join(rng.sample(names, rng.randint(1, 2)))
+
+    return pick(bricks), pick(categories), pick(GENDERS)
+
+
+class Command(BaseCommand):
+    help = "Compare bitmap and SQL catalog filtering at growing catalog sizes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="10000,100000,1000000")
+        parser.add_argument("--queries", type=int, default=50)
+        parser.add_argument(
+            "--pages", type=int, default=3, help="Pages followed per query."
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options["sizes"].split(",")]
+        rng = random.Random(0)
+
+        with throwaway_database():
+            bricks = [
+                Brick.objects.create(name=f"Brick {i}", slug=f"b{i}") for i in range(20)
+            ]
+            categories = [
+                Category.objects.create(name=f"Category {i}", slug=f"c{i}")
+                for i in range(10)
+            ]
+            genders = {
+                name.lower(): Gender.objects.create(name=name.lower())
+                for name in GENDERS
+            }
+            regions = {name: Region.objects.create(name=name) for name in REGIONS}
+
+            count = 0
+            for size in sizes:
+                self.populate(rng, count, size, bricks, categories, genders, regions)
+                count = size
+                self.compare(rng, size, bricks, categories, options)
+
+    def populate(self, rng, start, stop, bricks, categories, genders, regions):
+        GenderThrough = Product.genders.through
+        RegionThrough = Product.regions.through
+        now = timezone.now()
+
+        for batch_start in range(start, stop, 5000):
+            products, links = [], []
+            for index in range(batch_start, min(batch_start + 5000, stop)):
+                gender_names = rng.sample(GENDERS, rng.randint(1, 2))
+                region_names = rng.sample(REGIONS, rng.randint(1, 3))
+                product = Product(
+                    title=f"Product {index}",
+                    brick=rng.choice(bricks),
+                    category=rng.choice(categories),
+                    gender=", ".join(gender_names),
+                    style_region=", ".join(region_names),
+                    mrp=rng.choice([None, rng.randint(100, 9999)]),
+                    go_live_date=now,
+                    is_active=rng.random() < 0.8,
+                )
+                products.append(product)
+                links.append((gender_names, region_names))
+
+            Product.objects.bulk_create(products)
+            GenderThrough.objects.bulk_create(
+                GenderThrough(product=product, gender=genders[name.lower()])
+                for product, (gender_names, _) in zip(products, links)
+                for name in gender_names
+            )
+            RegionThrough.objects.bulk_create(
+                RegionThrough(product=product, region=regions[name])
+                for product, (_, region_names) in zip(products, links)
+                for name in region_names
+            )
+
+    def run_queries(self, queries, pages):
+        results = []
+        started = time.perf_counter()
+        for query in queries:
+            cursor = None
+            ids = []
+            for _ in range(pages):
+                page = query(cursor)
+                ids += [row["id"] for row in page["results"]]
+                cursor = page["next"]
+                if cursor is None:
+                    break
+            results.append(ids)
+        return (time.perf_counter() - started) / len(queries), results
+
+    def compare(self, rng, size, bricks, categories, options):
+        brick_names = [brick.name for brick in bricks]
+        category_names = [category.name for category in categories]
+        sorts = ["newest", "mrp_low_to_high", "mrp_high_to_low"]
+
+        queries, listings = [], []
+        for _ in range(options["queries"]):
+            filters = random_filters(rng, brick_names, category_names)
+            sort_by = rng.choice(sorts)
+            queries.append(
+                lambda cursor, filters=filters, sort_by=sort_by: filter_page(
+                    *filters, sort_by, cursor, 20
+                )
+            )
+            listings.append(filtered_rows(*filters, sort_by))
+            regions = sorted(rng.sample(REGIONS, rng.randint(1, 2)))
+            queries.append(
+                lambda cursor, regions=regions: catalog_page(regions, cursor, 20)
+            )
+            listings.append(catalog_rows(regions))
+
+        # What the pages should add up to: the unpaginated, ordered listing
+        expected = [
+            list(listing.values_list("id", flat=True)[: options["pages"] * 20])
+            for listing in listings
+        ]
+
+        with override_settings(CATALOG_BITMAP_FILTERS=False):
+            sql_time, sql_results = self.run_queries(queries, options["pages"])
+
+        with override_settings(CATALOG_BITMAP_FILTERS=True):
+            started = time.perf_counter()
+            product_bitmaps.build()
+            build_time = time.perf_counter() - started
+            bitmap_time, bitmap_results = self.run_queries(queries, options["pages"])
+
+        stats = product_bitmaps.stats()
+        sql_mismatches = sum(a != b for a, b in zip(sql_results, expected))
+        bitmap_mismatches = sum(a != b for a, b in zip(bitmap_results, expected))
+        self.stdout.write(
+            f"{size:>9} products  sql {sql_time * 1000:8.2f} ms/query  "
+            f"bitmap {bitmap_time * 1000:8.2f} ms/query  "
+            f"build {build_time:6.2f} s  "
+            f"memory {stats['memory_bytes'] / 2**20:7.1f} MiB  "
+            f"mismatches sql {sql_mismatches} bitmap {bitmap_mismatches}"
+        )
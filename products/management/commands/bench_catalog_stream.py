@@ -0,0 +1,106 @@
+import multiprocessing
+import resource
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from shopipy_server.benchmarks import throwaway_database
+
+
+MODES = ["list", "json", "ndjson"]
+
+
+def run_mode(mode, database_name, results):
+    # Runs in a fresh process so ru_maxrss is this request's own peak. The
+    # module is imported there before Django is set up, hence the late imports
+    import django
+
+    django.setup()
+    connections["default"].settings_dict["NAME"] = database_name
+
+    from rest_framework.renderers import JSONRenderer
+
+    from products.catalog import filtered_rows
+    from products.streaming import streaming_response
+
+    rows = filtered_rows("Any", "Any", "Any", "newest")
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    first_byte = None
+    size = 0
+
+    if mode == "list":
+        # What FilterProducts did before: every row in a list, one render
+        body = JSONRenderer().render(list(rows))
+        first_byte = time.perf_counter() - started
+        size = len(body)
+    else:
+        for chunk in streaming_response(rows, mode):
+            if first_byte is None and len(chunk) > 1:
+                first_byte = time.perf_counter() - started
+            size += len(chunk)
+
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((elapsed, first_byte, peak - baseline, size))
+
+
+class Command(BaseCommand):
+    help = "Compare peak RSS of list and streaming catalog responses."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--products",
+            type=int,
+            action="append",
+            default=[],
+            help="Catalog size, repeat for several, e.g. --products 10000.",
+        )
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context("spawn")
+        self.stdout.write(
+            f"{'products':>9} {'mode':<7} {'wall s':>8} {'ttfb ms':>8} "
+            f"{'+rss MB':>8} {'body MB':>8}"
+        )
+
+        with throwaway_database() as connection:
+            database_name = connection.settings_dict["NAME"]
+            count = 0
+            for size in sorted(options["products"] or [10000, 100000]):
+                self.populate(count, size)
+                count = size
+                # Children read the file, make sure it's all there
+                connection.close()
+
+                for mode in MODES:
+                    results = context.Queue()
+                    process = context.Process(
+                        target=run_mode, args=(mode, database_name, results)
+                    )
+                    process.start()
+                    elapsed, first_byte, rss_delta, body_size = results.get()
+                    process.join()
+                    self.stdout.write(
+                        f"{size:>9} {mode:<7} {elapsed:>8.2f} "
+                        f"{first_byte * 1000:>8.1f} {rss_delta / 1024:>8.1f} "
+                        f"{body_size / 2**20:>8.1f}"
+                    )
+
+    def populate(self, start, stop):
+        from products.models import Product
+
+        now = timezone.now()
+        for batch_start in range(start, stop, 5000):
+            Product.objects.bulk_create(
+                Product(
+                    title=f"Product {index}",
+                    gender="Men, Women",
+                    mrp=index % 5000,
+                    style_region="Western",
+                    go_live_date=now,
+                )
+                for index in range(batch_start, min(batch_start + 5000, stop))
+            )
@@ -0,0 +1,92 @@
+import multiprocessing
+import resource
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+import numpy as np
+
+from products.images import compress_image
+
+
+def legacy_compress_image(data):
+    """The Product.save code path this engine replaced."""
+    from skimage.transform import resize
+
+    uploaded_image = Image.open(BytesIO(data))
+    image_array = np.array(uploaded_image)
+    compressed_image = resize(image_array, (1920, 1280))
+    compressed_pil_image = Image.fromarray((compressed_image * 255).astype(np.uint8))
+    image_buffer = BytesIO()
+    compressed_pil_image.save(image_buffer, format="JPEG")
+    return image_buffer.getvalue()
+
+
+ENGINES = {
+    "skimage": legacy_compress_image,
+    "pillow": compress_image,
+}
+
+
+def run_engine(engine, data, results):
+    # Runs in a fresh process so ru_maxrss is this engine's own peak
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    output = ENGINES[engine](data)
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((elapsed, peak - baseline, peak, len(output)))
+
+
+def sample_image(width, height):
+    rng = np.random.default_rng(0)
+    gradient = np.linspace(0, 255, width, dtype=np.uint8)
+    pixels = np.broadcast_to(gradient[None, :, None], (height, width, 3)).copy()
+    pixels[::7] = rng.integers(0, 255, (len(pixels[::7]), width, 3), dtype=np.uint8)
+    image_buffer = BytesIO()
+    Image.fromarray(pixels).save(image_buffer, format="JPEG", quality=92)
+    return image_buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = "Compare peak RSS and wall time of the image resize engines."
+
+    def add_arguments(self, parser):
+        parser.add_argument("images", nargs="*", help="Sample image paths.")
+        parser.add_argument(
+            "--size",
+            action="append",
+            default=[],
+            help="Generate a WIDTHxHEIGHT sample, e.g. 6000x4000 (24MP).",
+        )
+
+    def handle(self, *args, **options):
+        samples = []
+        for path in options["images"]:
+            with open(path, "rb") as image_file:
+                samples.append((path, image_file.read()))
+        for size in options["size"] or ([] if samples else ["6000x4000"]):
+            width, height = (int(value) for value in size.lower().split("x"))
+            samples.append((f"generated {size}", sample_image(width, height)))
+
+        context = multiprocessing.get_context("spawn")
+        self.stdout.write(
+            f"{'sample':<30} {'engine':<8} {'wall s':>8} {'+rss MB':>9} "
+            f"{'peak MB':>9} {'out KB':>8}"
+        )
+        for name, data in samples:
+            for engine in ENGINES:
+                results = context.Queue()
+                process = context.Process(
+                    target=run_engine, args=(engine, data, results)
+                )
+                process.start()
+                elapsed, rss_delta, peak, output_size = results.get()
+                process.join()
+                self.stdout.write(
+                    f"{name[-30:]:<30} {engine:<8} {elapsed:>8.3f} "
+                    f"{rss_delta / 1024:>9.1f} {peak / 1024:>9.1f} "
+                    f"{output_size / 1024:>8.1f}"
+                )
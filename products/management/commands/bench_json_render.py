@@ -0,0 +1,89 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from products.catalog import catalog_page
+from products.models import Brand, Brick, Category, Product
+from shopipy_server.benchmarks import throwaway_database
+from shopipy_server.renderers import FastJSONRenderer
+
+
+RENDERERS = {
+    "stdlib": JSONRenderer(),
+    "fast": FastJSONRenderer(),
+}
+
+
+def sample_product(index, brand, category, brick, now):
+    renditions = {
+        name: {
+            "width": width,
+            "webp": f"renditions/{index:020d}-image_1-{name}.webp",
+            "jpeg": f"renditions/{index:020d}-image_1-{name}.jpg",
+        }
+        for name, width in (("thumbnail", 320), ("card", 720), ("zoom", 1600))
+    }
+    return Product(
+        title=f"Printed cotton kurta with dupatta {index}",
+        brand=brand,
+        category=category,
+        brick=brick,
+        gender="Men, Women",
+        mrp=1999 + index % 500,
+        wsp=1199 + index % 300,
+        style_code=f"SC-{index:06d}",
+        image_1=f"media/product-{index}.jpg",
+        image_2=f"media/product-{index}-back.jpg",
+        image_renditions={"image_1": renditions},
+        go_live_date=now,
+        style_region="Western, North_Indian",
+        stock_items={
+            "g1": {
+                "id": "a485502a-0f1a-43a0-a977-dc6ac16c3a0c",
+                "title": "Pack of 6",
+                "total": 6,
+                "discount": "10.00",
+                "items": {size: {"qty": 1} for size in ("S", "M", "L", "XL")},
+            }
+        },
+        is_active=True,
+    )
+
+
+class Command(BaseCommand):
+    help = "Compare JSON renderers on FetchProducts payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=2000)
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            now = timezone.now()
+            brand = Brand.objects.create(name="Brand", slug="brand")
+            category = Category.objects.create(name="Kurta", slug="kurta")
+            brick = Brick.objects.create(name="Top", slug="top")
+            Product.objects.bulk_create(
+                sample_product(index, brand, category, brick, now)
+                for index in range(options["products"])
+            )
+
+            self.stdout.write(
+                f"{'payload':<16} {'renderer':<8} {'ms/render':>10} {'KB':>8}"
+            )
+            for page_size in (20, 100, options["products"]):
+                payload = catalog_page([], None, page_size)
+                outputs = {}
+                for name, renderer in RENDERERS.items():
+                    started = time.perf_counter()
+                    for _ in range(options["repeat"]):
+                        outputs[name] = renderer.render(payload)
+                    elapsed = (time.perf_counter() - started) / options["repeat"]
+                    self.stdout.write(
+                        f"{f'{page_size} products':<16} {name:<8} "
+                        f"{elapsed * 1000:>10.3f} {len(outputs[name]) / 1024:>8.1f}"
+                    )
+                if outputs["stdlib"] != outputs["fast"]:
+                    self.stdout.write(self.style.WARNING("  outputs differ"))
@@ -0,0 +1,63 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from products.image_worker import process_batch
+from products.models import Product
+from shopipy_server.benchmarks import throwaway_database, throwaway_storage
+
+from .bench_image_resize import legacy_compress_image, sample_image
+
+
+class Command(BaseCommand):
+    help = "Time N admin-style edits of a product with a large image_1."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--edits", type=int, default=10)
+        parser.add_argument("--size", default="6000x4000")
+
+    def handle(self, *args, **options):
+        width, height = (int(value) for value in options["size"].lower().split("x"))
+        data = sample_image(width, height)
+
+        with throwaway_database(), throwaway_storage():
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                self.run_edits(executor, data, options["edits"])
+
+    def run_edits(self, executor, data, edits):
+        product = Product(
+            title="Benchmark product",
+            gender="Men",
+            go_live_date=timezone.now(),
+            image_1=SimpleUploadedFile("benchmark.jpg", data),
+        )
+        product.save()
+        process_batch(executor, 1, 1)
+        product.refresh_from_db()
+
+        # What every Product.save used to do: resize, re-encode and upload
+        started = time.perf_counter()
+        for _ in range(edits):
+            with product.image_1.open("rb") as image_file:
+                compressed = legacy_compress_image(image_file.read())
+            product.image_1.storage.save(product.image_1.name, ContentFile(compressed))
+        legacy = (time.perf_counter() - started) / edits
+
+        queued = 0
+        started = time.perf_counter()
+        for index in range(edits):
+            product.title = f"Benchmark product {index}"
+            product.save()
+            queued += product.image_status == Product.IMAGE_PENDING
+            process_batch(executor, 1, 1)
+        current = (time.perf_counter() - started) / edits
+
+        self.stdout.write(f"legacy save path: {legacy * 1000:9.1f} ms per edit")
+        self.stdout.write(
+            f"save + queue drain: {current * 1000:9.1f} ms per edit "
+            f"({queued}/{edits} edits queued image work)"
+        )
@@ -0,0 +1,71 @@
+import http.client
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand
+
+
+def run_client(url, token, count):
+    """One keep-alive connection issuing count GETs. Returns latencies."""
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80)
+    latencies = []
+    errors = 0
+    try:
+        for _ in range(count):
+            started = time.perf_counter()
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            latencies.append(time.perf_counter() - started)
+            if response.status != 200:
+                errors += 1
+    finally:
+        connection.close()
+    return latencies, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test a running catalog endpoint, e.g. the same URL served by "
+        "gunicorn (WSGI) and by uvicorn shopipy_server.asgi:application (ASGI)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000/products/")
+        parser.add_argument("--token", default="", help="Bearer access token.")
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument(
+            "--requests", type=int, default=50, help="Requests per client."
+        )
+
+    def handle(self, *args, **options):
+        concurrency = options["concurrency"]
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(
+                executor.map(
+                    lambda _: run_client(
+                        options["url"], options["token"], options["requests"]
+                    ),
+                    range(concurrency),
+                )
+            )
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for result, _ in results for latency in result)
+        errors = sum(errors for _, errors in results)
+        percentiles = statistics.quantiles(latencies, n=100)
+
+        self.stdout.write(f"requests     {len(latencies)} ({errors} non-200)")
+        self.stdout.write(f"throughput   {len(latencies) / elapsed:.1f} req/s")
+        self.stdout.write(f"p50 latency  {percentiles[49] * 1000:.1f} ms")
+        self.stdout.write(f"p99 latency  {percentiles[98] * 1000:.1f} ms")
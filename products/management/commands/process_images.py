@@ -0,0 +1,47 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from products.image_worker import process_batch, requeue_stale
+
+
+class Command(BaseCommand):
+    help = "Drain the product image queue, compressing images in a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--batch-size", type=int, default=20)
+        parser.add_argument("--max-attempts", type=int, default=3)
+        parser.add_argument(
+            "--stale-after",
+            type=int,
+            default=15,
+            help="Minutes after which a claimed job is handed out again.",
+        )
+        parser.add_argument("--sleep", type=float, default=5.0)
+        parser.add_argument(
+            "--once", action="store_true", help="Exit once the queue is empty."
+        )
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(minutes=options["stale_after"])
+
+        with ProcessPoolExecutor(max_workers=options["workers"]) as executor:
+            while True:
+                requeued = requeue_stale(stale_after)
+                if requeued:
+                    self.stdout.write(f"Requeued {requeued} stale image jobs")
+
+                claimed = process_batch(
+                    executor, options["batch_size"], options["max_attempts"]
+                )
+                if claimed:
+                    self.stdout.write(f"Processed {claimed} product images")
+                    continue
+
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from products.models import Product
+from products.search import (
+    clear_search_index,
+    document_rows,
+    search_enabled,
+    write_documents,
+)
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product full-text search index from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if not search_enabled():
+            raise CommandError("The search index needs SQLite FTS5.")
+
+        batch_size = options["batch_size"]
+        indexed = 0
+        with transaction.atomic():
+            clear_search_index()
+            rows = document_rows(Product.objects.order_by())
+            batch = []
+            for row in rows.iterator(chunk_size=batch_size):
+                batch.append(row)
+                if len(batch) == batch_size:
+                    indexed += write_documents(batch)
+                    batch = []
+            indexed += write_documents(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} products"))
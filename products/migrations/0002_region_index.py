@@ -0,0 +1,75 @@
+# Generated by Django 5.0 on 2026-10-18 18:02
+
+from django.db import migrations, models
+
+
+# Frozen copy of products.models.parse_regions as of this migration
+def parse_regions(value):
+    if not value:
+        return []
+    names = {name.strip().lower() for name in value.split(",")}
+    return sorted(name for name in names if name)
+
+
+def backfill_regions(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    Region = apps.get_model("products", "Region")
+    ProductRegion = Product.regions.through
+
+    names = set()
+    product_regions = []
+    for product_id, style_region in Product.objects.values_list("id", "style_region"):
+        product_names = parse_regions(style_region)
+        names.update(product_names)
+        product_regions.append((product_id, product_names))
+
+    Region.objects.bulk_create([Region(name=name) for name in sorted(names)])
+    region_ids = dict(Region.objects.values_list("name", "id"))
+
+    ProductRegion.objects.bulk_create(
+        [
+            ProductRegion(product_id=product_id, region_id=region_ids[name])
+            for product_id, product_names in product_regions
+            for name in product_names
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Region",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=150, unique=True)),
+            ],
+            options={
+                "verbose_name_plural": "regions",
+            },
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="regions",
+            field=models.ManyToManyField(
+                blank=True,
+                editable=False,
+                related_name="products",
+                to="products.region",
+            ),
+        ),
+        migrations.RunPython(backfill_regions, migrations.RunPython.noop),
+    ]
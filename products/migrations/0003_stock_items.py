@@ -0,0 +1,160 @@
+# Generated by Django 5.0 on 2026-10-18 18:05
+
+import django.db.models.deletion
+import uuid
+from decimal import Decimal, InvalidOperation
+from django.db import migrations, models
+
+
+def to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def to_decimal(value):
+    try:
+        return Decimal(str(value).strip().rstrip("%") or 0).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        return Decimal(0)
+
+
+def explode_stock_items(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    StockItem = apps.get_model("products", "StockItem")
+    StockItemSize = apps.get_model("products", "StockItemSize")
+
+    seen_ids = set()
+    for product in Product.objects.only("id", "stock_items").iterator():
+        if not isinstance(product.stock_items, dict):
+            continue
+
+        sizes = []
+        projection = {}
+        for key, group in product.stock_items.items():
+            try:
+                stock_id = uuid.UUID(str(group.get("id")))
+            except ValueError:
+                stock_id = uuid.uuid4()
+            if stock_id in seen_ids:
+                stock_id = uuid.uuid4()
+            seen_ids.add(stock_id)
+
+            stock_item = StockItem.objects.create(
+                id=stock_id,
+                product=product,
+                key=key,
+                title=group.get("title", ""),
+                total=to_int(group.get("total")),
+                discount=to_decimal(group.get("discount")),
+            )
+            projection[key] = {
+                "id": str(stock_item.id),
+                "title": stock_item.title,
+                "total": stock_item.total,
+                "discount": str(stock_item.discount),
+                "items": {},
+            }
+            for size, item in (group.get("items") or {}).items():
+                qty = to_int(item.get("qty") if isinstance(item, dict) else item)
+                sizes.append(StockItemSize(stock_item_id=stock_id, size=size, qty=qty))
+                projection[key]["items"][size] = {"qty": qty}
+
+        StockItemSize.objects.bulk_create(sizes)
+        Product.objects.filter(pk=product.pk).update(stock_items=projection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0002_region_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockItem",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        help_text="Group key in the stock_items projection",
+                        max_length=100,
+                    ),
+                ),
+                ("title", models.CharField(max_length=255)),
+                ("total", models.PositiveIntegerField(default=0)),
+                (
+                    "discount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=5),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stock_groups",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "stock items",
+                "ordering": ("product", "key"),
+            },
+        ),
+        migrations.CreateModel(
+            name="StockItemSize",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("size", models.CharField(max_length=50)),
+                ("qty", models.PositiveIntegerField(default=0)),
+                (
+                    "stock_item",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="sizes",
+                        to="products.stockitem",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("stock_item", "id"),
+            },
+        ),
+        migrations.AddIndex(
+            model_name="stockitem",
+            index=models.Index(
+                fields=["product", "total"], name="stock_item_available_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="stockitem",
+            constraint=models.UniqueConstraint(
+                fields=("product", "key"), name="unique_stock_item_key"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="stockitemsize",
+            constraint=models.UniqueConstraint(
+                fields=("stock_item", "size"), name="unique_stock_item_size"
+            ),
+        ),
+        migrations.RunPython(explode_stock_items, migrations.RunPython.noop),
+    ]
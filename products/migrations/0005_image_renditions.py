@@ -0,0 +1,17 @@
+# Generated by Django 5.0 on 2026-10-18 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0004_image_queue"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="image_renditions",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
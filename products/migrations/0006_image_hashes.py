@@ -0,0 +1,17 @@
+# Generated by Django 5.0 on 2026-10-18 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0005_image_renditions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="image_hashes",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
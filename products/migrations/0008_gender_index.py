@@ -0,0 +1,80 @@
+# Generated by Django 5.0 on 2026-10-18 18:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Frozen copy of products.models.parse_genders as of this migration
+def parse_genders(value):
+    if not value:
+        return []
+    names = {name.strip().lower() for name in value.split(",")}
+    return sorted(name for name in names if name)
+
+
+def backfill_genders(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    Gender = apps.get_model("products", "Gender")
+    ProductGender = Product.genders.through
+
+    names = set()
+    product_genders = []
+    for product_id, gender in Product.objects.values_list("id", "gender"):
+        product_names = parse_genders(gender)
+        names.update(product_names)
+        product_genders.append((product_id, product_names))
+
+    Gender.objects.bulk_create([Gender(name=name) for name in sorted(names)])
+    gender_ids = dict(Gender.objects.values_list("name", "id"))
+
+    ProductGender.objects.bulk_create(
+        [
+            ProductGender(product_id=product_id, gender_id=gender_ids[name])
+            for product_id, product_names in product_genders
+            for name in product_names
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0007_product_keyset_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Gender",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=150, unique=True)),
+            ],
+            options={
+                "verbose_name_plural": "genders",
+            },
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="genders",
+            field=models.ManyToManyField(
+                blank=True,
+                editable=False,
+                related_name="products",
+                to="products.gender",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["mrp", "id"], name="product_mrp_id_idx"),
+        ),
+        migrations.RunPython(backfill_genders, migrations.RunPython.noop),
+    ]
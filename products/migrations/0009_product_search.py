@@ -0,0 +1,63 @@
+# Generated by Django 5.0 on 2026-10-18 18:25
+
+from django.db import migrations
+
+# Frozen copies of the products.search statements as of this migration
+CREATE_SEARCH_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_search USING fts5("
+    "product_id UNINDEXED, title, brand, category, brick, collection, "
+    "style_code, gender, "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+
+DROP_SEARCH_TABLE = "DROP TABLE IF EXISTS products_search"
+
+INSERT_DOCUMENT = (
+    "INSERT OR REPLACE INTO products_search "
+    "(rowid, product_id, title, brand, category, brick, collection, "
+    "style_code, gender) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)"
+)
+
+DOCUMENT_FIELDS = (
+    "id",
+    "title",
+    "brand__name",
+    "category__name",
+    "brick__name",
+    "collection__name",
+    "style_code",
+    "gender",
+)
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "sqlite":
+        return
+    Product = apps.get_model("products", "Product")
+
+    schema_editor.execute(CREATE_SEARCH_TABLE)
+    rows = Product.objects.order_by().values_list(*DOCUMENT_FIELDS)
+    params = [
+        # rowid: the top 63 bits of the UUID
+        (row[0].int >> 65, row[0].hex, *(value or "" for value in row[1:]))
+        for row in rows.iterator(chunk_size=2000)
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(INSERT_DOCUMENT, params)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(DROP_SEARCH_TABLE)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0008_gender_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
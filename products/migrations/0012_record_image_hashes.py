@@ -0,0 +1,43 @@
+# Generated by Django 5.0 on 2026-10-18 21:02
+
+from django.db import migrations
+
+IMAGE_FIELDS = ("image_1", "image_2", "image_3", "image_4")
+
+
+def record_stored_images(apps, schema_editor):
+    """
+    Images stored before image_hashes existed were compressed on save, so
+    record them as processed by name. The hashes are unknown until
+    backfill_renditions reads the files.
+    """
+    Product = apps.get_model("products", "Product")
+    products = Product.objects.filter(image_status="done").only(
+        "pk", "image_hashes", *IMAGE_FIELDS
+    )
+    changed = []
+    for product in products.iterator(chunk_size=2000):
+        missing = [
+            field
+            for field in IMAGE_FIELDS
+            if getattr(product, field).name and field not in product.image_hashes
+        ]
+        for field in missing:
+            product.image_hashes[field] = {
+                "name": getattr(product, field).name,
+                "source": None,
+                "output": None,
+            }
+        if missing:
+            changed.append(product)
+    Product.objects.bulk_update(changed, ["image_hashes"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0011_catalog_version"),
+    ]
+
+    operations = [
+        migrations.RunPython(record_stored_images, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.0 on 2026-10-18 21:20
+
+from django.db import migrations
+
+# Frozen copies of the products.search statements as of this migration
+CREATE_ROWIDS_TABLE = (
+    "CREATE TABLE IF NOT EXISTS products_search_rowid ("
+    "rowid INTEGER PRIMARY KEY, product_id TEXT NOT NULL UNIQUE)"
+)
+
+DROP_ROWIDS_TABLE = "DROP TABLE IF EXISTS products_search_rowid"
+
+INSERT_ROWID = "INSERT OR IGNORE INTO products_search_rowid (product_id) VALUES (%s)"
+
+INSERT_DOCUMENT = (
+    "INSERT OR REPLACE INTO products_search "
+    "(rowid, product_id, title, brand, category, brick, collection, "
+    "style_code, gender) "
+    "VALUES ((SELECT rowid FROM products_search_rowid WHERE product_id = %s), "
+    "%s, %s, %s, %s, %s, %s, %s, %s)"
+)
+
+# 0009's rowid, the top 63 bits of the UUID, which two products can share
+INSERT_HASHED_DOCUMENT = (
+    "INSERT OR REPLACE INTO products_search "
+    "(rowid, product_id, title, brand, category, brick, collection, "
+    "style_code, gender) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)"
+)
+
+DOCUMENT_FIELDS = (
+    "id",
+    "title",
+    "brand__name",
+    "category__name",
+    "brick__name",
+    "collection__name",
+    "style_code",
+    "gender",
+)
+
+
+def documents(apps):
+    Product = apps.get_model("products", "Product")
+    rows = Product.objects.order_by().values_list(*DOCUMENT_FIELDS)
+    for row in rows.iterator(chunk_size=2000):
+        yield row[0], [value or "" for value in row[1:]]
+
+
+def reindex_with_rowids(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "sqlite":
+        return
+
+    schema_editor.execute(CREATE_ROWIDS_TABLE)
+    rows = list(documents(apps))
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM products_search")
+        cursor.executemany(INSERT_ROWID, [(product_id.hex,) for product_id, _ in rows])
+        cursor.executemany(
+            INSERT_DOCUMENT,
+            [(product_id.hex, product_id.hex, *text) for product_id, text in rows],
+        )
+
+
+def reindex_with_hashed_rowids(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "sqlite":
+        return
+
+    rows = list(documents(apps))
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM products_search")
+        cursor.executemany(
+            INSERT_HASHED_DOCUMENT,
+            [
+                (product_id.int >> 65, product_id.hex, *text)
+                for product_id, text in rows
+            ],
+        )
+    schema_editor.execute(DROP_ROWIDS_TABLE)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0012_record_image_hashes"),
+    ]
+
+    operations = [
+        migrations.RunPython(reindex_with_rowids, reindex_with_hashed_rowids),
+    ]
@@ -1,15 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import pre_save
-from django.dispatch import receiver
-from django.core.files.base import ContentFile
+from django.core.exceptions import ValidationError
 from django.db import models
-from io import BytesIO
-from skimage.io import imsave
-from skimage.transform import resize
-from PIL import Image
+from django.utils import timezone
+
+from .images import file_digest
 
-import numpy as np
 import uuid
 
 
@@ -58,12 +54,82 @@ class Collection(models.Model):
         return self.name
 
 
+class Region(models.Model):
+    name = models.CharField(max_length=150, unique=True)
+
+    class Meta:
+        verbose_name_plural = "regions"
+
+    def __str__(self):
+        return self.name
+
+
+class Gender(models.Model):
+    name = models.CharField(max_length=150, unique=True)
+
+    class Meta:
+        verbose_name_plural = "genders"
+
+    def __str__(self):
+        return self.name
+
+
+def parse_regions(region_string):
+    """Split a comma-separated region string into sorted, normalized names."""
+    if not region_string:
+        return []
+    regions = {region.strip().lower() for region in region_string.split(",")}
+    return sorted(region for region in regions if region)
+
+
+# Gender strings use the same comma-separated format
+parse_genders = parse_regions
+
+
 # Don't remove
 def default_stock_items():
     return [""]
 
 
 class Product(models.Model):
+    IMAGE_PENDING = "pending"
+    IMAGE_PROCESSING = "processing"
+    IMAGE_DONE = "done"
+    IMAGE_FAILED = "failed"
+    IMAGE_STATUS_CHOICES = [
+        (IMAGE_PENDING, "Pending"),
+        (IMAGE_PROCESSING, "Processing"),
+        (IMAGE_DONE, "Done"),
+        (IMAGE_FAILED, "Failed"),
+    ]
+    IMAGE_FIELDS = ("image_1", "image_2", "image_3", "image_4")
+    # Served by the catalog endpoints and copied into orders. Leaves out the
+    # image queue's bookkeeping, which may hold raw error text
+    PUBLIC_FIELDS = (
+        "id",
+        "brand",
+        "title",
+        "category",
+        "brick",
+        "collection",
+        "gender",
+        "mrp",
+        "wsp",
+        "style_code",
+        "style_2",
+        "image_1",
+        "image_2",
+        "image_3",
+        "image_4",
+        "image_renditions",
+        "created",
+        "uploaded_by",
+        "go_live_date",
+        "style_region",
+        "stock_items",
+        "is_active",
+    )
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     brand = models.ForeignKey(
         Brand, related_name="brand", on_delete=models.SET_NULL, blank=False, null=True
@@ -91,6 +157,10 @@ class Product(models.Model):
         blank=False,
         help_text="Enter comma-separated values for genders (e.g., Men, Women, Kids)",
     )
+    # Index of gender, kept in sync on save
+    genders = models.ManyToManyField(
+        Gender, related_name="products", blank=True, editable=False
+    )
     mrp = models.DecimalField(max_digits=9, decimal_places=2, blank=True, null=True)
     wsp = models.DecimalField(max_digits=9, decimal_places=2, blank=True, null=True)
     style_code = models.CharField(max_length=255, blank=True, null=True)  # future value
@@ -104,7 +174,26 @@ class Product(models.Model):
     image_2 = models.FileField(upload_to="media/", blank=True, null=True)
     image_3 = models.FileField(upload_to="media/", blank=True, null=True)
     image_4 = models.FileField(upload_to="media/", blank=True, null=True)
+    # {"image_1": {"thumbnail": {"width": 320, "webp": ..., "jpeg": ...}}}
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
+    # {"image_1": {"name": ..., "source": sha256, "output": sha256}}, per
+    # processed image, so unchanged files are never processed twice. Images
+    # stored before the hashes existed have null hashes until
+    # backfill_renditions reads them
+    image_hashes = models.JSONField(default=dict, blank=True, editable=False)
+    image_status = models.CharField(
+        max_length=20,
+        choices=IMAGE_STATUS_CHOICES,
+        default=IMAGE_DONE,
+        db_index=True,
+        editable=False,
+    )
+    image_attempts = models.PositiveSmallIntegerField(default=0, editable=False)
+    image_error = models.TextField(blank=True, editable=False)
+    image_claimed_at = models.DateTimeField(blank=True, null=True, editable=False)
     created = models.DateTimeField(auto_now_add=True, blank=False)
+    # Bumped by queryset updates too, it validates FetchItem responses
+    updated_at = models.DateTimeField(auto_now=True)
     uploaded_by = models.ForeignKey(
         User,
         related_name="uploader",
@@ -122,6 +211,11 @@ class Product(models.Model):
         null=True,
         help_text="Enter comma-separated values (e.g., Western, South_Indian, North_Indian)",
     )
+    # Index of style_region, kept in sync on save
+    regions = models.ManyToManyField(
+        Region, related_name="products", blank=True, editable=False
+    )
+    # Read-only projection of StockItem rows, see refresh_stock_items
     stock_items = models.JSONField(
         default=default_stock_items,
         blank=False,
@@ -134,6 +228,12 @@ class Product(models.Model):
     class Meta:
         verbose_name_plural = "Products"
         ordering = ("-created",)
+        indexes = [
+            # Keyset pagination of the newest-first listings
+            models.Index(fields=["-created", "-id"], name="product_created_id_idx"),
+            # Keyset pagination of the price sorted listings
+            models.Index(fields=["mrp", "id"], name="product_mrp_id_idx"),
+        ]
 
     def get_choices_as_list(self, field_name):
         field_value = getattr(self, field_name)
@@ -143,37 +243,156 @@ class Product(models.Model):
             ]
         return []
 
-    def save(self, *args, **kwargs):
-        uploaded_image = Image.open(self.image_1)
-        image_array = np.array(uploaded_image)
-
-        # new size of the image
-        compressed_image = resize(image_array, (1920, 1280))
-
-        compressed_pil_image = Image.fromarray(
-            (compressed_image * 255).astype(np.uint8)
+    def sync_regions(self):
+        names = parse_regions(self.style_region)
+        Region.objects.bulk_create(
+            [Region(name=name) for name in names], ignore_conflicts=True
         )
-        image_buffer = BytesIO()
-        compressed_pil_image.save(image_buffer, format="JPEG")
+        self.regions.set(Region.objects.filter(name__in=names))
 
-        self.image_1.save(
-            f"{self.image_1.name}",  # Preserve the original file name
-            ContentFile(image_buffer.getvalue()),
-            save=False,
+    def sync_genders(self):
+        names = parse_genders(self.gender)
+        Gender.objects.bulk_create(
+            [Gender(name=name) for name in names], ignore_conflicts=True
+        )
+        self.genders.set(Gender.objects.filter(name__in=names))
+
+    def stock_items_projection(self):
+        groups = self.stock_groups.prefetch_related("sizes")
+        projection = {group.key: group.to_stock_group() for group in groups}
+        return projection or default_stock_items()
+
+    def refresh_stock_items(self):
+        """Rewrite the read-only stock_items JSON from the StockItem rows."""
+        self.stock_items = self.stock_items_projection()
+        Product.objects.filter(pk=self.pk).update(
+            stock_items=self.stock_items, updated_at=timezone.now()
         )
 
+    def stale_image_fields(self):
+        """Stored image files that differ from the last processed ones."""
+        stale = []
+        for field in self.IMAGE_FIELDS:
+            image = getattr(self, field)
+            record = self.image_hashes.get(field)
+            if image and (not record or record["name"] != image.name):
+                stale.append(field)
+        return stale
+
+    def changed_image_fields(self):
+        changed = []
+        for field in self.IMAGE_FIELDS:
+            image = getattr(self, field)
+            record = self.image_hashes.get(field)
+            if not image:
+                if record:
+                    # Image was cleared, forget what was processed for it
+                    self.image_hashes.pop(field)
+                    self.image_renditions.pop(field, None)
+                continue
+
+            if not image._committed:
+                digest = file_digest(image)
+                if record and digest in (record["source"], record["output"]):
+                    # Same content as the processed file, keep that one
+                    setattr(self, field, record["name"])
+                    continue
+                changed.append(field)
+            elif not record or record["name"] != image.name:
+                changed.append(field)
+        return changed
+
+    def save(self, *args, **kwargs):
+        # Compression runs in the background, see the process_images command
+        if self.changed_image_fields():
+            self.image_status = self.IMAGE_PENDING
+            self.image_attempts = 0
+            self.image_error = ""
+
         super().save(*args, **kwargs)
 
     def __str__(self):
         return str(self.id)
 
 
-@receiver(pre_save, sender=Product)
-def add_uuid_to_stock_items(sender, instance, **kwargs):
-    if instance.stock_items and instance.stock_items != [""]:
-        for key, value in instance.stock_items.items():
-            if "id" not in value:
-                value["id"] = str(uuid.uuid4())
+class StockItem(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    product = models.ForeignKey(
+        Product, related_name="stock_groups", on_delete=models.CASCADE
+    )
+    key = models.CharField(
+        max_length=100, help_text="Group key in the stock_items projection"
+    )
+    title = models.CharField(max_length=255)
+    total = models.PositiveIntegerField(default=0)
+    discount = models.DecimalField(max_digits=5, decimal_places=2, default=0)
 
+    class Meta:
+        verbose_name_plural = "stock items"
+        ordering = ("product", "key")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "key"], name="unique_stock_item_key"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["product", "total"], name="stock_item_available_idx"),
+        ]
+
+    def to_stock_group(self):
+        return {
+            "id": str(self.id),
+            "title": self.title,
+            "total": self.total,
+            "discount": str(self.discount),
+            "items": {size.size: {"qty": size.qty} for size in self.sizes.all()},
+        }
+
+    def __str__(self):
+        return self.title
 
-pre_save.connect(add_uuid_to_stock_items, sender=Product)
+
+class StockItemSize(models.Model):
+    stock_item = models.ForeignKey(
+        StockItem, related_name="sizes", on_delete=models.CASCADE
+    )
+    size = models.CharField(max_length=50)
+    qty = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ("stock_item", "id")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["stock_item", "size"], name="unique_stock_item_size"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.size}: {self.qty}"
+
+
+class CatalogVersion(models.Model):
+    """
+    Single row with the catalog cache version, shared by every process so
+    a bump in one of them (a worker, a checkout) invalidates the others.
+    """
+
+    version = models.PositiveBigIntegerField(default=0)
+    modified = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"v{self.version}"
+
+
+def validate_stock_total(title, total, quantities, sold=False):
+    """
+    The size quantities describe a stock item as it was stocked, total is
+    what is left to sell: checkout only decrements total. So total has to
+    match the sizes on a new stock item, and may fall below them once it
+    has been sold from, never rise above them.
+    """
+    stocked = sum(quantities)
+    if total > stocked or (total != stocked and not sold):
+        raise ValidationError(
+            f'Error: you\'ve provided Item: "{title}" with Total = "{total}", which doesn\'t matches with the item counts. Please check the items "qty" or update the "total" value.'
+        )
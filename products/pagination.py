@@ -0,0 +1,116 @@
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+
+from .models import Product
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder cuts datetimes to milliseconds, the cursor has to
+    # point at the exact value or rows in the same millisecond are skipped
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values):
+    data = json.dumps(values, cls=CursorEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over values() querysets of products, ordered by one
+    field with the primary key as tiebreaker, e.g. KeysetPaginator("-created").
+    Each page is a single indexed range query, however deep it is: the
+    cursor holds the last row's (field, id), never an offset.
+    """
+
+    def __init__(self, ordering="-created", page_size=None):
+        self.descending = ordering.startswith("-")
+        self.field_name = ordering.lstrip("-")
+        self.field = Product._meta.get_field(self.field_name)
+        self.page_size = page_size or settings.CATALOG_PAGE_SIZE
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.GET.get("page_size", self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(page_size, 1), settings.CATALOG_MAX_PAGE_SIZE)
+
+    def order_by(self):
+        # Only a nullable field needs NULLS LAST, anything more keeps the
+        # database from reading the order straight off the index
+        nulls_last = True if self.field.null else None
+        if self.descending:
+            return [F(self.field_name).desc(nulls_last=nulls_last), F("id").desc()]
+        return [F(self.field_name).asc(nulls_last=nulls_last), F("id").asc()]
+
+    def position(self, cursor):
+        """The (field value, id) a cursor points at."""
+        try:
+            value, pk = decode_cursor(cursor)
+            return self.field.to_python(value), Product._meta.pk.to_python(pk)
+        except (ValueError, TypeError, ValidationError):
+            raise InvalidCursor("Invalid cursor")
+
+    def seek(self, cursor):
+        """Filter for the rows after the cursor position."""
+        value, pk = self.position(cursor)
+
+        past = "lt" if self.descending else "gt"
+        if value is None:
+            # Already in the trailing nulls
+            return Q(**{f"{self.field_name}__isnull": True, f"id__{past}": pk})
+
+        # The inclusive bound is redundant, but lets the database seek the
+        # index to the cursor instead of scanning up to it
+        after = Q(**{f"{self.field_name}__{past}e": value}) & (
+            Q(**{f"{self.field_name}__{past}": value}) | Q(**{f"id__{past}": pk})
+        )
+        if self.field.null:
+            after |= Q(**{f"{self.field_name}__isnull": True})
+        return after
+
+    def paginate(self, queryset, cursor, page_size):
+        """The page's rows plus one, to tell whether another page follows."""
+        queryset = queryset.order_by(*self.order_by())
+        if cursor:
+            queryset = queryset.filter(self.seek(cursor))
+        return queryset[: page_size + 1]
+
+    def make_page(self, rows, page_size):
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            next_cursor = encode_cursor([last[self.field_name], last["id"]])
+        return {"next": next_cursor, "results": rows}
+
+    def page(self, queryset, cursor, page_size):
+        return self.make_page(
+            list(self.paginate(queryset, cursor, page_size)), page_size
+        )
+
+    async def apage(self, queryset, cursor, page_size):
+        rows = [row async for row in self.paginate(queryset, cursor, page_size)]
+        return self.make_page(rows, page_size)
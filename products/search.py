@@ -0,0 +1,170 @@
+import re
+
+from django.db import connection
+
+from .catalog import CATALOG_FIELDS
+from .models import Product
+
+
+SEARCH_TABLE = "products_search"
+# FTS rowid per product, FTS5 tables need an integer key and ids are UUIDs
+SEARCH_ROWIDS_TABLE = "products_search_rowid"
+
+# Indexed text per product, in FTS column order, with bm25 weights
+SEARCH_COLUMNS = {
+    "title": "title",
+    "brand": "brand__name",
+    "category": "category__name",
+    "brick": "brick__name",
+    "collection": "collection__name",
+    "style_code": "style_code",
+    "gender": "gender",
+}
+SEARCH_WEIGHTS = (10.0, 6.0, 4.0, 4.0, 2.0, 8.0, 1.0)
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def search_enabled(using=connection):
+    return using.vendor == "sqlite"
+
+
+def create_search_table(schema_editor):
+    # Prefix indexes on 2 and 3 characters keep typeahead queries on the index
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        f"product_id UNINDEXED, {', '.join(SEARCH_COLUMNS)}, "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    schema_editor.execute(
+        f"CREATE TABLE IF NOT EXISTS {SEARCH_ROWIDS_TABLE} ("
+        "rowid INTEGER PRIMARY KEY, product_id TEXT NOT NULL UNIQUE)"
+    )
+
+
+def drop_search_table(schema_editor):
+    schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+    schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_ROWIDS_TABLE}")
+
+
+# A product's rowid, assigned by SQLite the first time it's indexed
+ROWID_QUERY = f"(SELECT rowid FROM {SEARCH_ROWIDS_TABLE} WHERE product_id = %s)"
+
+
+def document_rows(products):
+    return products.values_list("id", *SEARCH_COLUMNS.values())
+
+
+def write_documents(rows, using=connection):
+    placeholders = ", ".join(["%s"] * (len(SEARCH_COLUMNS) + 1))
+    params = [
+        (row[0].hex, row[0].hex, *(value or "" for value in row[1:])) for row in rows
+    ]
+    with using.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT OR IGNORE INTO {SEARCH_ROWIDS_TABLE} (product_id) VALUES (%s)",
+            [param[:1] for param in params],
+        )
+        # Replacing by rowid updates a product's document in place
+        cursor.executemany(
+            f"INSERT OR REPLACE INTO {SEARCH_TABLE} "
+            f"(rowid, product_id, {', '.join(SEARCH_COLUMNS)}) "
+            f"VALUES ({ROWID_QUERY}, {placeholders})",
+            params,
+        )
+    return len(params)
+
+
+def index_products(products):
+    """(Re)index the products in a queryset. Returns the number indexed."""
+    if not search_enabled():
+        return 0
+    return write_documents(document_rows(products))
+
+
+def unindex_product(product_id):
+    if not search_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE rowid = {ROWID_QUERY}",
+            [product_id.hex],
+        )
+        cursor.execute(
+            f"DELETE FROM {SEARCH_ROWIDS_TABLE} WHERE product_id = %s",
+            [product_id.hex],
+        )
+
+
+def clear_search_index():
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        cursor.execute(f"DELETE FROM {SEARCH_ROWIDS_TABLE}")
+
+
+def match_expression(query):
+    """
+    FTS5 query for free text: every word must match, each as a prefix, so
+    "kur wom" finds "Kurta" for "Women". Returns None if there are no words.
+    """
+    tokens = TOKEN_PATTERN.findall(query)
+    if not tokens:
+        return None
+    return " ".join('"%s"*' % token for token in tokens)
+
+
+def search_product_ids(query, limit):
+    """Product ids matching query, best match first."""
+    expression = match_expression(query)
+    if expression is None:
+        return []
+
+    if search_enabled():
+        weights = ", ".join(str(weight) for weight in SEARCH_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT product_id FROM {SEARCH_TABLE} "
+                f"WHERE {SEARCH_TABLE} MATCH %s "
+                f"ORDER BY bm25({SEARCH_TABLE}, 0, {weights}) LIMIT %s",
+                [expression, limit],
+            )
+            return [Product._meta.pk.to_python(row[0]) for row in cursor.fetchall()]
+
+    if connection.vendor == "postgresql":
+        return postgres_search_product_ids(query, limit)
+
+    return list(
+        Product.objects.filter(title__icontains=query.strip()).values_list(
+            "id", flat=True
+        )[:limit]
+    )
+
+
+def postgres_search_product_ids(query, limit):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+    vector = None
+    for field, weight in zip(SEARCH_COLUMNS.values(), "ABBBCAD"):
+        field_vector = SearchVector(field, weight=weight)
+        vector = field_vector if vector is None else vector + field_vector
+
+    # Same prefix semantics as FTS5, as a raw tsquery
+    tokens = TOKEN_PATTERN.findall(query)
+    search_query = SearchQuery(
+        " & ".join(f"{token}:*" for token in tokens), search_type="raw"
+    )
+    return list(
+        Product.objects.annotate(rank=SearchRank(vector, search_query))
+        .filter(rank__gt=0)
+        .order_by("-rank")
+        .values_list("id", flat=True)[:limit]
+    )
+
+
+def search_products(query, limit):
+    product_ids = search_product_ids(query, limit)
+    rows = {
+        row["id"]: row
+        for row in Product.objects.filter(pk__in=product_ids).values(*CATALOG_FIELDS)
+    }
+    return [rows[product_id] for product_id in product_ids if product_id in rows]
@@ -0,0 +1,133 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .bitmaps import product_bitmaps
+from .cache import catalog_cache
+from .search import index_products, unindex_product
+from .models import (
+    Brand,
+    Brick,
+    Category,
+    Collection,
+    Product,
+    StockItem,
+    StockItemSize,
+)
+
+
+CATALOG_MODELS = (
+    Product,
+    Brand,
+    Category,
+    Brick,
+    Collection,
+    StockItem,
+    StockItemSize,
+)
+
+
+@receiver(post_save, sender=Product)
+def sync_product_indexes(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance.sync_regions()
+        instance.sync_genders()
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_products(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Product)
+def unindex_deleted_product(sender, instance, **kwargs):
+    unindex_product(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+def update_product_bitmaps(sender, instance, raw=False, **kwargs):
+    if not raw:
+        product_bitmaps.update(instance.pk)
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_bitmaps(sender, instance, **kwargs):
+    product_bitmaps.remove(instance.pk)
+
+
+# Product documents and item payloads carry these names, reindex and touch
+# the products on rename
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Brick)
+@receiver(post_save, sender=Collection)
+def reindex_named_products(sender, instance, raw=False, created=False, **kwargs):
+    if raw or created:
+        return
+    field = sender._meta.model_name
+    products = Product.objects.filter(**{field: instance})
+    products.update(updated_at=timezone.now())
+    index_products(products)
+    if field in ("brick", "category"):
+        # Bitsets are keyed by name, rebuild on next use
+        product_bitmaps.clear()
+
+
+# Deleting one nulls the foreign key without saving the products
+@receiver(pre_delete, sender=Brand)
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Brick)
+@receiver(pre_delete, sender=Collection)
+def touch_named_products(sender, instance, **kwargs):
+    field = sender._meta.model_name
+    products = Product.objects.filter(**{field: instance})
+    product_ids = list(products.values_list("pk", flat=True))
+    products.update(updated_at=timezone.now())
+
+    def reindex():
+        index_products(Product.objects.filter(pk__in=product_ids))
+        if field in ("brick", "category"):
+            product_bitmaps.clear()
+
+    # The products only lose the name once the delete has nulled their key
+    transaction.on_commit(reindex)
+
+
+@receiver(post_save, sender=StockItem)
+@receiver(post_delete, sender=StockItem)
+def refresh_stock_items_for_group(sender, instance, raw=False, **kwargs):
+    if not raw:
+        Product(pk=instance.product_id).refresh_stock_items()
+
+
+@receiver(post_save, sender=StockItemSize)
+@receiver(post_delete, sender=StockItemSize)
+def refresh_stock_items_for_size(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    product_id = (
+        StockItem.objects.filter(pk=instance.stock_item_id)
+        .values_list("product_id", flat=True)
+        .first()
+    )
+    if product_id:
+        Product(pk=product_id).refresh_stock_items()
+
+
+def bump_catalog_version(sender, **kwargs):
+    catalog_cache.bump_version()
+
+
+for model in CATALOG_MODELS:
+    post_save.connect(
+        bump_catalog_version,
+        sender=model,
+        dispatch_uid=f"catalog_save_{model.__name__}",
+    )
+    post_delete.connect(
+        bump_catalog_version,
+        sender=model,
+        dispatch_uid=f"catalog_delete_{model.__name__}",
+    )
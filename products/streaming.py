@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from shopipy_server.renderers import dumps
+
+
+STREAM_FORMATS = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def stream_format(request):
+    """The requested ?stream= format, or None for a regular response."""
+    requested = request.GET.get("stream")
+    return requested if requested in STREAM_FORMATS else None
+
+
+class RowWriter:
+    """
+    Encodes rows into one JSON array, or NDJSON lines, handing out a chunk
+    of rows at a time so memory stays flat however many rows there are.
+    """
+
+    def __init__(self, stream_format, chunk_size):
+        self.stream_format = stream_format
+        self.chunk_size = chunk_size
+        self.separator = b"\n" if stream_format == "ndjson" else b","
+        self.chunk = []
+        self.written = False
+
+    def start(self):
+        return b"[" if self.stream_format == "json" else b""
+
+    def add(self, row):
+        self.chunk.append(dumps(row))
+        if len(self.chunk) == self.chunk_size:
+            return self.flush()
+        return b""
+
+    def flush(self):
+        if not self.chunk:
+            return b""
+        prefix = self.separator if self.written else b""
+        data = prefix + self.separator.join(self.chunk)
+        self.chunk = []
+        self.written = True
+        return data
+
+    def finish(self):
+        data = self.flush()
+        if self.stream_format == "json":
+            return data + b"]"
+        return data + b"\n" if self.written else data
+
+
+def encode_rows(rows, stream_format):
+    writer = RowWriter(stream_format, settings.CATALOG_STREAM_CHUNK_SIZE)
+    yield writer.start()
+    for row in rows:
+        data = writer.add(row)
+        if data:
+            yield data
+    yield writer.finish()
+
+
+async def aencode_rows(rows, stream_format):
+    writer = RowWriter(stream_format, settings.CATALOG_STREAM_CHUNK_SIZE)
+    yield writer.start()
+    async for row in rows:
+        data = writer.add(row)
+        if data:
+            yield data
+    yield writer.finish()
+
+
+def streaming_response(queryset, stream_format):
+    rows = queryset.iterator(chunk_size=settings.CATALOG_STREAM_CHUNK_SIZE)
+    return StreamingHttpResponse(
+        encode_rows(rows, stream_format), content_type=STREAM_FORMATS[stream_format]
+    )
+
+
+def astreaming_response(queryset, stream_format):
+    rows = queryset.aiterator(chunk_size=settings.CATALOG_STREAM_CHUNK_SIZE)
+    return StreamingHttpResponse(
+        aencode_rows(rows, stream_format), content_type=STREAM_FORMATS[stream_format]
+    )
@@ -1,3 +1,388 @@
-from django.test import TestCase
+import hashlib
+import threading
+import json
+from datetime import timedelta
+from importlib import import_module
+from io import BytesIO
+from unittest import mock
+from uuid import UUID
 
-# Create your tests here.
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models.query import QuerySet
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from shopipy_server.benchmarks import throwaway_storage
+from .bitmaps import BitmapIndex, product_bitmaps
+from .cache import CatalogCache, LRUBackend
+from .catalog import (
+    ITEM_FIELDS,
+    SORT_PAGINATORS,
+    filter_page,
+    newest_first,
+    sort_paginator,
+)
+from .conditional import catalog_validators, item_validators
+from .image_worker import store_result
+from .images import EXIF_ORIENTATION, compress_image
+from .models import Brand, Brick, Category, Product
+from .search import search_product_ids
+from .streaming import encode_rows
+
+
+def jpeg_bytes(size, orientation=None):
+    image = Image.new("RGB", size, (200, 30, 30))
+    exif = Image.Exif()
+    if orientation:
+        exif[EXIF_ORIENTATION] = orientation
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+class CompressImageTests(SimpleTestCase):
+    def test_small_jpeg_is_still_processed(self):
+        # Inside the bounds already, but rotated by EXIF
+        data = jpeg_bytes((40, 20), orientation=6)
+
+        output = compress_image(data)
+
+        self.assertIsNotNone(output)
+        image = Image.open(BytesIO(output))
+        self.assertEqual(image.size, (20, 40))
+        self.assertNotIn(EXIF_ORIENTATION, image.getexif())
+
+    def test_recorded_output_is_not_processed_again(self):
+        output = compress_image(jpeg_bytes((40, 20)))
+        digest = hashlib.sha256(output).hexdigest()
+
+        self.assertIsNone(compress_image(output, digest))
+        self.assertIsNotNone(compress_image(jpeg_bytes((40, 20)), digest))
+
+
+def create_products(count, created_step, mrp=None):
+    """count products, created created_step apart, oldest first."""
+    now = timezone.now().replace(microsecond=500000)
+    Product.objects.bulk_create(
+        Product(
+            title=f"Product {index}",
+            gender="Men",
+            mrp=mrp,
+            go_live_date=now,
+        )
+        for index in range(count)
+    )
+    for index, pk in enumerate(Product.objects.order_by("title").values_list("pk")):
+        Product.objects.filter(pk=pk[0]).update(created=now + created_step * index)
+
+
+def page_through(get_page):
+    """Every id get_page(cursor) returns, following cursors to the end."""
+    ids, cursor = [], None
+    while True:
+        page = get_page(cursor)
+        ids += [row["id"] for row in page["results"]]
+        cursor = page["next"]
+        if cursor is None:
+            return ids
+
+
+def paginator_pages(paginator, page_size):
+    rows = Product.objects.values(*ITEM_FIELDS)
+    return lambda cursor: paginator.page(rows, cursor, page_size)
+
+
+def listing_ids(paginator):
+    rows = Product.objects.order_by(*paginator.order_by())
+    return list(rows.values_list("id", flat=True))
+
+
+class KeysetPaginationTests(TestCase):
+    def test_rows_in_one_millisecond(self):
+        create_products(10, timedelta(microseconds=10))
+
+        ids = page_through(paginator_pages(newest_first, 3))
+
+        self.assertEqual(len(ids), 10)
+        self.assertEqual(ids, listing_ids(newest_first))
+
+    def test_tied_keys(self):
+        create_products(10, timedelta(0), mrp=100)
+
+        for paginator in [newest_first, *SORT_PAGINATORS.values()]:
+            with self.subTest(paginator.field_name, descending=paginator.descending):
+                ids = page_through(paginator_pages(paginator, 3))
+                self.assertEqual(ids, listing_ids(paginator))
+                self.assertEqual(len(set(ids)), 10)
+
+
+@override_settings(CATALOG_BITMAP_FILTERS=True)
+class BitmapPaginationTests(TestCase):
+    def setUp(self):
+        product_bitmaps.clear()
+
+    def test_pages_match_listing(self):
+        # Sub-millisecond created and tied prices
+        create_products(10, timedelta(microseconds=10), mrp=100)
+
+        for sort_by in ["newest", "mrp_low_to_high", "mrp_high_to_low"]:
+            with self.subTest(sort_by):
+                ids = page_through(
+                    lambda cursor: filter_page("Any", "Any", "Any", sort_by, cursor, 3)
+                )
+                self.assertEqual(ids, listing_ids(sort_paginator(sort_by)))
+
+    def test_build_swaps_in_without_losing_saves(self):
+        create_products(3, timedelta(seconds=1))
+        product_bitmaps.build()
+        store = BitmapIndex._store
+        during_build = {}
+
+        def read_page():
+            page = product_bitmaps.page_ids(newest_first, {}, None, 10)
+            during_build["page"] = len(page)
+
+        def store_row(index, row):
+            if index is not product_bitmaps and len(index.ordinals) == 2:
+                reader = threading.Thread(target=read_page, daemon=True)
+                reader.start()
+                reader.join(timeout=2)
+                during_build["blocked"] = reader.is_alive()
+                # Saved after its row was read
+                pk = UUID(int=next(iter(index.ordinals)))
+                Product.objects.filter(pk=pk).update(gender="Women")
+                product_bitmaps.update(pk)
+                during_build["saved"] = pk
+            store(index, row)
+
+        with mock.patch.object(BitmapIndex, "_store", store_row):
+            product_bitmaps.build()
+
+        # Pages were served from the old arrays while the rows loaded
+        self.assertFalse(during_build["blocked"])
+        self.assertEqual(during_build["page"], 3)
+        self.assertEqual(
+            product_bitmaps.page_ids(newest_first, {"gender": ["women"]}, None, 10),
+            [during_build["saved"]],
+        )
+
+
+@override_settings(CATALOG_STREAM_CHUNK_SIZE=50)
+class StreamingTests(TestCase):
+    def test_rows_are_pulled_one_chunk_at_a_time(self):
+        pulled = 0
+
+        def rows():
+            nonlocal pulled
+            for index in range(1000):
+                pulled += 1
+                yield {"id": index}
+
+        written = 0
+        for data in encode_rows(rows(), "ndjson"):
+            written += data.count(b"\n")
+            # Never more than one unsent chunk of rows in memory
+            self.assertLessEqual(pulled - written, 50)
+        self.assertEqual(written, 1000)
+
+    def test_filter_stream_iterates_the_queryset(self):
+        create_products(120, timedelta(microseconds=1))
+
+        with mock.patch.object(
+            QuerySet, "iterator", autospec=True, side_effect=QuerySet.iterator
+        ) as iterator:
+            response = self.client.get(
+                "/products/filter/Any/Any/Any/newest/search/?stream=ndjson"
+            )
+            body = b"".join(response.streaming_content)
+
+        self.assertTrue(response.streaming)
+        iterator.assert_called_once_with(mock.ANY, chunk_size=50)
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(
+            [row["id"] for row in rows],
+            [str(pk) for pk in listing_ids(newest_first)],
+        )
+
+
+class ConditionalTests(TestCase):
+    def test_catalog_validators_follow_other_processes(self):
+        request = RequestFactory().get("/products/guest/")
+        etag, _ = catalog_validators(request)
+
+        # Another worker's cache, with its own in-process entries
+        CatalogCache(LRUBackend()).bump_version()
+
+        self.assertNotEqual(catalog_validators(request)[0], etag)
+
+    def test_item_validators_read_the_stored_updated_at(self):
+        create_products(1, timedelta(0))
+        product = Product.objects.get()
+        etag, _ = item_validators(product.pk)
+
+        Product.objects.filter(pk=product.pk).update(
+            updated_at=product.updated_at + timedelta(seconds=1)
+        )
+
+        self.assertNotEqual(item_validators(product.pk)[0], etag)
+
+
+class StoreResultTests(TestCase):
+    def claimed_product(self):
+        product = Product.objects.create(
+            title="Shirt",
+            gender="Men",
+            go_live_date=timezone.now(),
+            image_1=ContentFile(jpeg_bytes((40, 20)), name="shirt.jpg"),
+        )
+        Product.objects.filter(pk=product.pk).update(
+            image_status=Product.IMAGE_PROCESSING
+        )
+        return Product.objects.get(pk=product.pk)
+
+    def test_result_is_stored_under_a_new_name(self):
+        with throwaway_storage():
+            product = self.claimed_product()
+            upload = product.image_1.name
+
+            self.assertEqual(store_result(product, (b"compressed", {}, {})), 1)
+
+            stored = Product.objects.get(pk=product.pk).image_1.name
+            self.assertNotEqual(stored, upload)
+            self.assertTrue(default_storage.exists(upload))
+            self.assertTrue(default_storage.exists(stored))
+
+    def test_stale_result_is_dropped(self):
+        with throwaway_storage():
+            product = self.claimed_product()
+            # Re-uploaded while the job ran
+            Product.objects.filter(pk=product.pk).update(
+                image_status=Product.IMAGE_PENDING, image_1="media/new.jpg"
+            )
+
+            self.assertEqual(store_result(product, (b"compressed", {}, {})), 0)
+
+            self.assertEqual(
+                Product.objects.get(pk=product.pk).image_1.name, "media/new.jpg"
+            )
+            self.assertEqual(default_storage.listdir("media")[1], ["shirt.jpg"])
+
+
+class ChangedImageTests(TestCase):
+    def test_saving_an_existing_product_does_not_requeue_its_images(self):
+        migration = import_module("products.migrations.0012_record_image_hashes")
+        with throwaway_storage():
+            product = Product.objects.create(
+                title="Shirt",
+                gender="Men",
+                go_live_date=timezone.now(),
+                image_1=ContentFile(jpeg_bytes((40, 20)), name="shirt.jpg"),
+            )
+            # Stored before image_hashes existed
+            Product.objects.filter(pk=product.pk).update(
+                image_status=Product.IMAGE_DONE, image_hashes={}
+            )
+            migration.record_stored_images(apps, None)
+
+            product = Product.objects.get(pk=product.pk)
+            product.title = "Blue shirt"
+            product.save()
+
+            product.refresh_from_db()
+            self.assertEqual(product.image_status, Product.IMAGE_DONE)
+            self.assertEqual(product.image_hashes["image_1"]["name"], "media/shirt.jpg")
+
+            product.image_1 = ContentFile(jpeg_bytes((20, 40)), name="other.jpg")
+            product.save()
+            self.assertEqual(product.image_status, Product.IMAGE_PENDING)
+
+
+class SearchTests(TestCase):
+    def create_product(self, title, **fields):
+        return Product.objects.create(
+            title=title, gender="Men", go_live_date=timezone.now(), **fields
+        )
+
+    def test_products_with_close_ids_are_both_indexed(self):
+        # Same top 63 bits
+        first = self.create_product("Linen kurta", id=UUID(int=(7 << 65) | 1))
+        second = self.create_product("Linen shirt", id=UUID(int=(7 << 65) | 2))
+
+        self.assertCountEqual(search_product_ids("linen", 10), [first.pk, second.pk])
+
+        first.delete()
+        self.assertEqual(search_product_ids("linen", 10), [second.pk])
+
+    def test_brand_rename_and_delete_reindex_products(self):
+        brand = Brand.objects.create(name="Fabindia", slug="fabindia")
+        product = self.create_product("Kurta", brand=brand)
+        self.assertEqual(search_product_ids("fabin", 10), [product.pk])
+
+        brand.name = "Biba"
+        brand.save()
+        self.assertEqual(search_product_ids("fabin", 10), [])
+        self.assertEqual(search_product_ids("biba", 10), [product.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            brand.delete()
+        self.assertEqual(search_product_ids("biba", 10), [])
+        self.assertEqual(search_product_ids("kurta", 10), [product.pk])
+
+
+@override_settings(CATALOG_PRICE_BUCKETS=[0, 500, 1000])
+class FacetTests(TestCase):
+    def setUp(self):
+        top = Brick.objects.create(name="Top", slug="top")
+        bottom = Brick.objects.create(name="Bottom", slug="bottom")
+        kurta = Category.objects.create(name="Kurta", slug="kurta")
+        saree = Category.objects.create(name="Saree", slug="saree")
+        for index, (brick, category, gender, mrp) in enumerate(
+            [
+                (top, kurta, "Men", 100),
+                (top, kurta, "Women", 600),
+                (top, saree, "Women", 1500),
+                (bottom, kurta, "Men", 2500),
+                (bottom, saree, "Men, Women", None),
+            ]
+        ):
+            Product.objects.create(
+                title=f"Product {index}",
+                brick=brick,
+                category=category,
+                gender=gender,
+                mrp=mrp,
+                go_live_date=timezone.now(),
+            )
+
+    def facets(self, **params):
+        return self.client.get("/products/facets/", params).json()
+
+    def test_one_facet_narrows_the_others(self):
+        facets = self.facets(category="Kurta")
+
+        # Its own counts ignore the selection, so other values stay offered
+        self.assertEqual(facets["category"], {"Kurta": 3, "Saree": 2})
+        self.assertEqual(facets["brick"], {"Top": 2, "Bottom": 1})
+        self.assertEqual(facets["gender"], {"men": 2, "women": 1})
+        self.assertEqual(facets["price"], {"0-500": 1, "500-1000": 1, "1000+": 1})
+
+    def test_each_facet_ignores_only_its_own_selection(self):
+        facets = self.facets(category="Kurta", gender="Women")
+
+        self.assertEqual(facets["category"], {"Kurta": 1, "Saree": 2})
+        self.assertEqual(facets["gender"], {"men": 2, "women": 1})
+        self.assertEqual(facets["brick"], {"Top": 1})
+        self.assertEqual(facets["price"], {"0-500": 0, "500-1000": 1, "1000+": 0})
+
+    def test_selecting_more_values_of_a_facet_keeps_its_counts(self):
+        self.assertEqual(
+            self.facets(category="Kurta,Saree")["category"],
+            self.facets()["category"],
+        )
+        self.assertEqual(
+            self.facets(category="Kurta,Saree")["brick"],
+            {"Top": 3, "Bottom": 2},
+        )
@@ -1,16 +1,26 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+
+# Read-only catalog views, native async under ASGI
+catalog_views = async_views if settings.ASYNC_CATALOG_VIEWS else views
 
 
 urlpatterns = [
-    path("", views.FetchProducts.as_view(), name="fetch_all_products"),
+    path("", catalog_views.FetchProducts.as_view(), name="fetch_all_products"),
     path(
-        "guest/", views.UnAuthFetchProducts.as_view(), name="fetch_all_products_guest"
+        "guest/",
+        catalog_views.UnAuthFetchProducts.as_view(),
+        name="fetch_all_products_guest",
     ),  # unAuthenticated API for products
-    path("item/<uuid:id>/", views.FetchItem.as_view(), name="fetch_item"),
+    path("item/<uuid:id>/", catalog_views.FetchItem.as_view(), name="fetch_item"),
     path(
         "filter/<str:item_type>/<str:category>/<str:gender>/<str:sort_by>/search/",
-        views.FilterProducts.as_view(),
+        catalog_views.FilterProducts.as_view(),
         name="filter_products",
     ),
+    path("facets/", views.ProductFacets.as_view(), name="product_facets"),
+    path("search/", views.SearchProducts.as_view(), name="search_products"),
+    path("cache/stats/", views.CatalogCacheStats.as_view(), name="catalog_cache_stats"),
 ]
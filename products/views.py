@@ -2,101 +2,130 @@ from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
-import re
-from django.db.models import Q
-from django.core.paginator import Paginator
+from django.conf import settings
 
+from customers.identity import get_identity
 from customers.models import CustomerUser
-from .models import Product
-from .middleware import TokenAuthenticationMiddleware
+from .models import Product, parse_regions
+from .bitmaps import product_bitmaps
+from .cache import catalog_cache
+from .catalog import (
+    CATALOG_FIELDS,
+    RELATED_FIELDS,
+    catalog_rows,
+    fetch_catalog,
+    filter_page,
+    filtered_rows,
+    item_data,
+    newest_first,
+)
+from .conditional import (
+    catalog_validators,
+    item_validators,
+    not_modified,
+    set_validators,
+)
+from .facets import fetch_facets
+from .pagination import InvalidCursor, KeysetPaginator
+from .search import search_products
+from .streaming import stream_format, streaming_response
 
 
 # Create your views here.
 class FetchProducts(APIView):
     def get(self, request):
         try:
-            user_id = getattr(request, "user_id", None)
-            active_user = CustomerUser.objects.get(email=user_id)
-            active_user_region_string = active_user.region
-            active_regions = ""
-
-            if active_user_region_string:
-                active_regions = active_user_region_string.split(",")
-
-            product_fields = [field.name for field in Product._meta.get_fields()]
-            products_list = []  # Create a list to store products for all regions
-
-            product_fields.append("brand__name")
-            product_fields.append("brick__name")
-            product_fields.append("category__name")
-            product_fields.append("collection__name")
-            product_fields.append("uploaded_by__username")
-
-            if not active_regions:
-                print("Empty Regions")
-                products = Product.objects.all().values(*product_fields)
-                products_list.extend(products)
-
-            else:
-                print("Non-Empty Regions")
-                for region in active_regions:
-                    products = Product.objects.filter(
-                        style_region__icontains=region.strip()
-                    ).values(*product_fields)
-                    products_list.extend(products)
-
-            return Response(products_list, status=status.HTTP_200_OK)
+            active_regions = parse_regions(get_identity(request).region)
+
+            # Pages differ per customer region, keep them out of shared caches
+            etag, last_modified = catalog_validators(request, active_regions)
+            unchanged = not_modified(request, etag, last_modified, private=True)
+            if unchanged:
+                return unchanged
+
+            output_format = stream_format(request)
+            if output_format:
+                response = streaming_response(
+                    catalog_rows(active_regions), output_format
+                )
+                return set_validators(response, etag, last_modified, private=True)
+
+            products_page = fetch_catalog(
+                active_regions,
+                request.GET.get("cursor"),
+                newest_first.get_page_size(request),
+            )
 
-        except Product.DoesNotExist:
+            response = Response(products_page, status=status.HTTP_200_OK)
+            return set_validators(response, etag, last_modified, private=True)
+
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        except CustomerUser.DoesNotExist:
             print("Object not found.")
             return Response(
                 {"error": "Error occured"}, status=status.HTTP_404_NOT_FOUND
             )
 
+
+class CatalogCacheStats(APIView):
+    def get(self, request):
+        try:
+            if not get_identity(request).is_staff:
+                return Response(
+                    {"error": "Staff only"}, status=status.HTTP_403_FORBIDDEN
+                )
+
+            stats = catalog_cache.stats()
+            if settings.CATALOG_BITMAP_FILTERS:
+                stats["bitmaps"] = product_bitmaps.stats()
+
+            return Response(stats, status=status.HTTP_200_OK)
+
         except CustomerUser.DoesNotExist:
-            print("Object not found.")
             return Response(
-                {"error": "Error occured"}, status=status.HTTP_404_NOT_FOUND
+                {"error": "User not found"}, status=status.HTTP_404_NOT_FOUND
             )
 
 
 # For unAuthenticated Users
 class UnAuthFetchProducts(APIView):
-    def get(self, request):
-        product_fields = [field.name for field in Product._meta.get_fields()]
+    paginator = KeysetPaginator("-created", settings.CATALOG_GUEST_PAGE_SIZE)
 
-        product_fields.append("brand__name")
-        product_fields.append("brick__name")
-        product_fields.append("category__name")
-        product_fields.append("collection__name")
-        product_fields.append("uploaded_by__username")
+    def get(self, request):
+        etag, last_modified = catalog_validators(request)
+        unchanged = not_modified(request, etag, last_modified)
+        if unchanged:
+            return unchanged
 
-        products = Product.objects.all().values(*product_fields)
+        products = Product.objects.all().values(*CATALOG_FIELDS)
 
-        paginator_instance = Paginator(products, 5)
-        page_number = request.GET.get("page")
-        page_obj = paginator_instance.get_page(page_number)
+        try:
+            products_page = self.paginator.page(
+                products,
+                request.GET.get("cursor"),
+                self.paginator.get_page_size(request),
+            )
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response(list(page_obj), status=status.HTTP_200_OK)
+        response = Response(products_page, status=status.HTTP_200_OK)
+        return set_validators(response, etag, last_modified)
 
 
 class FetchItem(APIView):
     def get(self, request, id):
-        try:
-            obj = Product.objects.get(id=id)
-            product_fields = [field.name for field in Product._meta.get_fields()]
+        etag, last_modified = item_validators(id)
+        unchanged = not_modified(request, etag, last_modified)
+        if unchanged:
+            return unchanged
 
-            data = {}
-            for field in product_fields:
-                value = getattr(obj, field)
-                if field == "uploaded_by":
-                    data[field] = value.username if value else None
-                elif hasattr(value, "name"):
-                    data[field] = value.name
-                else:
-                    data[field] = value
+        try:
+            obj = Product.objects.select_related(*RELATED_FIELDS).get(id=id)
 
-            return Response(data, status=status.HTTP_200_OK)
+            response = Response(item_data(obj), status=status.HTTP_200_OK)
+            return set_validators(response, etag, last_modified)
 
         except Product.DoesNotExist:
             print("Object not found.")
@@ -107,52 +136,42 @@ class FetchItem(APIView):
 
 class FilterProducts(APIView):
     def get(self, request, item_type, category, gender, sort_by):
-        filters = {
-            "brick": item_type,
-            "category": category,
-            "gender": gender,
-        }
-        filters = {key: value for key, value in filters.items() if value != "Any"}
-
-        filtered_products = Product.objects.all()
-
-        # Apply filters dynamically to the queryset
-        for field, value in filters.items():
-            if field == "gender":
-                all_values = value.split(",")
-                q_object = Q()
+        output_format = stream_format(request)
+        if output_format:
+            rows = filtered_rows(item_type, category, gender, sort_by)
+            return streaming_response(rows, output_format)
 
-                for val in all_values:
-                    val = val.strip()
-                    escaped_value = re.escape(val)
-                    regex_pattern = rf"\b{escaped_value}\b"
-                    q_object |= Q(gender__regex=regex_pattern)
-
-                filtered_products = filtered_products.filter(q_object)
+        try:
+            products_page = filter_page(
+                item_type,
+                category,
+                gender,
+                sort_by,
+                request.GET.get("cursor"),
+                newest_first.get_page_size(request),
+            )
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-            else:
-                all_values = value.split(",")
-                q_object = Q()
+        return Response(products_page, status=status.HTTP_200_OK)
 
-                for val in all_values:
-                    val = val.strip()
-                    q_object |= Q(**{f"{field}__name": val})
 
-                filtered_products = filtered_products.filter(q_object)
+class ProductFacets(APIView):
+    def get(self, request):
+        facets = fetch_facets(
+            request.GET.get("item_type", "Any"),
+            request.GET.get("category", "Any"),
+            request.GET.get("gender", "Any"),
+        )
 
-        products_data = list(filtered_products.values())
+        return Response(facets, status=status.HTTP_200_OK)
 
-        # Sorting part if it exists
-        if sort_by != "Any" and sort_by != "newest":
-            sort_order = {"mrp_low_to_high": False, "mrp_high_to_low": True}
-            sorting_param = sort_order.get(sort_by, False)
 
-            products_data = sorted(
-                products_data, key=lambda x: x["mrp"], reverse=sorting_param
-            )
-        elif sort_by == "newest":
-            products_data = sorted(
-                products_data, key=lambda x: x["created"], reverse=True
-            )
+class SearchProducts(APIView):
+    def get(self, request):
+        query = request.GET.get("q", "")
+        limit = newest_first.get_page_size(request)
 
-        return Response(list(products_data), status=status.HTTP_200_OK)
+        return Response(
+            {"results": search_products(query, limit)}, status=status.HTTP_200_OK
+        )
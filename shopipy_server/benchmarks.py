@@ -0,0 +1,44 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.core.management.base import CommandError
+from django.db import connections
+from django.test.utils import override_settings
+
+
+@contextmanager
+def throwaway_database(alias="default"):
+    """Migrate a scratch SQLite file for a benchmark run, drop it afterwards."""
+    connection = connections[alias]
+    if connection.vendor != "sqlite":
+        raise CommandError("Benchmarks only run against SQLite.")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(
+            tmp_dir, "benchmark.sqlite3"
+        )
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            yield connection
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+@contextmanager
+def throwaway_storage():
+    """Point the default file storage at a temporary directory."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storages = {
+            "default": {
+                "BACKEND": "django.core.files.storage.FileSystemStorage",
+                "OPTIONS": {"location": tmp_dir},
+            },
+            "staticfiles": {
+                "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+            },
+        }
+        with override_settings(STORAGES=storages, MEDIA_ROOT=tmp_dir):
+            yield tmp_dir
@@ -0,0 +1,122 @@
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from threading import Lock
+
+import jwt
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+
+
+logger = logging.getLogger(__name__)
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of recently verified access tokens, keyed by the token's
+    SHA-256 digest. Entries are dropped once the token's exp has passed.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, token):
+        key = hashlib.sha256(token.encode()).digest()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            payload, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def set(self, token, payload):
+        key = hashlib.sha256(token.encode()).digest()
+        with self._lock:
+            self._entries[key] = (payload, payload.get("exp"))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+verified_tokens = VerifiedTokenCache(getattr(settings, "TOKEN_CACHE_SIZE", 1024))
+
+
+def error_response(message):
+    logger.info("Rejected access token: %s", message)
+    return JsonResponse({"error": message}, status=401)
+
+
+def decode_access_token(token):
+    payload = verified_tokens.get(token)
+    if payload is None:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+        verified_tokens.set(token, payload)
+    return payload
+
+
+class TokenAuthenticationMiddleware:
+    """
+    Verifies the bearer token once per request for every app and attaches
+    the identity as request.user_id (and the claims as request.token_payload).
+    Runs natively under both WSGI and ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        error = self.authenticate(request)
+        if error is not None:
+            return error
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # Token checks never touch the database, so they run inline
+        error = self.authenticate(request)
+        if error is not None:
+            return error
+        return await self.get_response(request)
+
+    def authenticate(self, request):
+        authorization_header = request.META.get("HTTP_AUTHORIZATION", None)
+        if not authorization_header:
+            return None
+
+        try:
+            token_prefix, token = authorization_header.split()
+        except ValueError:
+            return error_response("Invalid authorization format")
+
+        if token_prefix.lower() != "bearer":
+            return error_response("Invalid token prefix")
+
+        try:
+            payload = decode_access_token(token)
+        except jwt.ExpiredSignatureError:
+            return error_response("Token expired")
+        except jwt.DecodeError:
+            return error_response("Invalid token")
+
+        request.token_payload = payload
+        request.user_id = payload.get("user_id")
+        return None
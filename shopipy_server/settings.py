@@ -94,8 +94,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
-    "customers.middleware.TokenAuthenticationMiddleware",
-    "products.middleware.TokenAuthenticationMiddleware",
+    "shopipy_server.middleware.TokenAuthenticationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -138,6 +137,12 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": {
+            # seconds to wait for the write lock under concurrent checkouts
+            "timeout": 20,
+        },
+        # A file rather than memory, so tests get WAL and the lock timeout too
+        "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
     }
 }
 
@@ -194,14 +199,65 @@ STORAGES = {
 }
 
 REST_FRAMEWORK = {
+    # API views identify customers from the bearer token, see
+    # shopipy_server.middleware; skip the per-request session user lookup
+    "DEFAULT_AUTHENTICATION_CLASSES": [],
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        "shopipy_server.renderers.FastJSONRenderer",
     ],
     "DEFAULT_PARSER_CLASSES": [
-        "rest_framework.parsers.JSONParser",
+        "shopipy_server.renderers.FastJSONParser",
     ],
 }
 
+# Serve the read-only catalog endpoints from native async views, set by
+# asgi.py so WSGI deployments keep the synchronous DRF views
+ASYNC_CATALOG_VIEWS = env.bool("ASYNC_CATALOG_VIEWS", default=False)
+
+# Recently verified access tokens kept per process
+TOKEN_CACHE_SIZE = 1024
+
+# Seconds a resolved customer identity is reused across requests
+IDENTITY_CACHE_TTL = 30
+
+# Catalog cache, "lru" keeps entries per process and the version in the
+# database, "django" keeps both in CACHES, which then has to be shared
+CATALOG_CACHE = {
+    "BACKEND": env("CATALOG_CACHE_BACKEND", default="lru"),
+}
+
+# Catalog listings are cursor paginated, clients may ask for up to
+# CATALOG_MAX_PAGE_SIZE rows with ?page_size=
+CATALOG_PAGE_SIZE = 20
+CATALOG_GUEST_PAGE_SIZE = 5
+CATALOG_MAX_PAGE_SIZE = 100
+
+# ?stream=json or ?stream=ndjson returns every matching row instead of a
+# page, read and written this many rows at a time
+CATALOG_STREAM_CHUNK_SIZE = 2000
+
+# Answer catalog filters from an in-process bitmap index instead of SQL,
+# rebuilt from the database after CATALOG_BITMAP_MAX_AGE seconds. Each
+# process only sees its own saves right away, other processes' ones can
+# take up to CATALOG_BITMAP_MAX_AGE seconds to show up in filtered pages
+CATALOG_BITMAP_FILTERS = env.bool("CATALOG_BITMAP_FILTERS", default=False)
+CATALOG_BITMAP_MAX_AGE = 300
+
+# Lower bounds of the price (mrp) facet buckets, the last one is open ended
+CATALOG_PRICE_BUCKETS = [0, 500, 1000, 2000, 5000]
+
+# Order exports read this many orders per query
+ORDER_EXPORT_CHUNK_SIZE = 500
+
+# Product image renditions, name -> width in pixels
+PRODUCT_IMAGE_RENDITIONS = {
+    "thumbnail": 320,
+    "card": 720,
+    "zoom": 1600,
+}
+
+PRODUCT_IMAGE_FORMATS = ["webp", "jpeg"]
+
 AWS_ACCESS_KEY_ID = env("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = env("AWS_SECRET_ACCESS_KEY")
 AWS_STORAGE_BUCKET_NAME = env("AWS_STORAGE_BUCKET_NAME")
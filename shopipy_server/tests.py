@@ -0,0 +1,91 @@
+import time
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import jwt
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from .middleware import TokenAuthenticationMiddleware, verified_tokens
+
+
+def access_token(expires_in):
+    expiry = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
+    return jwt.encode(
+        {"user_id": "token@example.com", "exp": expiry},
+        settings.SECRET_KEY,
+        algorithm="HS256",
+    )
+
+
+def bearer_request(token):
+    return RequestFactory().get("/products/", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+
+class TokenAuthenticationMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        verified_tokens.clear()
+        self.middleware = TokenAuthenticationMiddleware(lambda request: HttpResponse())
+
+    def test_cached_token_is_not_decoded_again(self):
+        token = access_token(3600)
+
+        with mock.patch(
+            "shopipy_server.middleware.jwt.decode", wraps=jwt.decode
+        ) as decode:
+            for _ in range(3):
+                request = bearer_request(token)
+                self.assertEqual(self.middleware(request).status_code, 200)
+                self.assertEqual(request.user_id, "token@example.com")
+
+        decode.assert_called_once()
+
+    def test_expired_token_is_rejected_even_when_cached(self):
+        token = access_token(-1)
+        # Cached while it was still valid
+        verified_tokens.set(
+            token,
+            jwt.decode(
+                token,
+                settings.SECRET_KEY,
+                algorithms=["HS256"],
+                options={"verify_exp": False},
+            ),
+        )
+
+        response = self.middleware(bearer_request(token))
+
+        self.assertEqual(response.status_code, 401)
+        self.assertIsNone(verified_tokens.get(token))
+
+    def test_cache_entries_expire_with_the_token(self):
+        token = access_token(60)
+        self.middleware(bearer_request(token))
+        self.assertIsNotNone(verified_tokens.get(token))
+
+        with mock.patch(
+            "shopipy_server.middleware.time.time", return_value=time.time() + 61
+        ):
+            self.assertIsNone(verified_tokens.get(token))
+
+    async def test_async_middleware(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        middleware = TokenAuthenticationMiddleware(get_response)
+        token = access_token(3600)
+
+        request = bearer_request(token)
+        response = await middleware(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(request.user_id, "token@example.com")
+
+        # Served from the cache the second time
+        with mock.patch("shopipy_server.middleware.jwt.decode") as decode:
+            response = await middleware(bearer_request(token))
+        self.assertEqual(response.status_code, 200)
+        decode.assert_not_called()
+
+        response = await middleware(bearer_request(access_token(-1)))
+        self.assertEqual(response.status_code, 401)